@@ -0,0 +1,212 @@
+import os
+import re
+import time
+import logging
+import threading
+from datetime import datetime, timedelta, timezone
+import streamlit as st
+from supabase import Client
+from dotenv import load_dotenv
+import metrics
+from metrics import timed
+from supabase_config import init_supabase, create_ai_comment, get_ai_replies_for_posts
+from ai_utils import get_ai_reply, is_ai_fallback
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Worker pool settings, all overridable through the environment
+AI_JOB_WORKERS = int(os.getenv("AI_JOB_WORKERS", "2"))
+AI_JOB_POLL_INTERVAL = float(os.getenv("AI_JOB_POLL_INTERVAL", "5"))
+AI_JOB_MAX_ATTEMPTS = int(os.getenv("AI_JOB_MAX_ATTEMPTS", "5"))
+AI_JOB_LEASE_SECONDS = int(os.getenv("AI_JOB_LEASE_SECONDS", "120"))
+
+# How often a card waiting on a queued reply checks for it, and for how long
+# before asking the user to refresh. Checks run in fragments, never blocking the page.
+AI_REPLY_POLL_SECONDS = float(os.getenv("AI_REPLY_POLL_SECONDS", "2"))
+AI_JOB_WAIT_SECONDS = float(os.getenv("AI_JOB_WAIT_SECONDS", "15"))
+
+@timed("ai_jobs.enqueue_ai_reply")
+def enqueue_ai_reply(supabase: Client, post_id: str, mode: str = "wise"):
+    """Queue an AI reply for a post; at most one job per post"""
+    try:
+        data = {"post_id": post_id, "mode": mode}
+        supabase.table("ai_reply_jobs").upsert(data, on_conflict="post_id", ignore_duplicates=True).execute()
+        get_ai_worker_pool().wake()
+        return True
+    except Exception as e:
+        st.error(f"Error queueing AI reply: {str(e)}")
+        metrics.mark_error()
+        return False
+
+@timed("ai_jobs.get_open_ai_jobs")
+def get_open_ai_jobs(supabase: Client, post_ids: list):
+    """Get the unfinished AI reply jobs for some posts, as {post_id: job}"""
+    if not post_ids:
+        return {}
+    try:
+        result = (
+            supabase.table("ai_reply_jobs")
+            .select("post_id, status, run_after")
+            .in_("post_id", list(post_ids))
+            .in_("status", ["pending", "running"])
+            .execute()
+        )
+        return {job["post_id"]: job for job in result.data or []}
+    except Exception as e:
+        st.error(f"Error fetching AI reply jobs: {str(e)}")
+        metrics.mark_error()
+        return {}
+
+_FRACTION_RE = re.compile(r"\.(\d+)")
+
+def _parse_utc(timestamp: str):
+    """Parse an ISO timestamp from the database; fromisoformat only takes any fraction length from Python 3.11"""
+    text = _FRACTION_RE.sub(lambda m: "." + m.group(1)[:6].ljust(6, "0"), timestamp.replace("Z", "+00:00"), 1)
+    dt = datetime.fromisoformat(text)
+    return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+
+def is_ai_job_due(job: dict):
+    """Whether a job is running or about to, rather than waiting out a retry backoff"""
+    if job["status"] == "running" or not job.get("run_after"):
+        return True
+    return _parse_utc(job["run_after"]) <= datetime.now(timezone.utc) + timedelta(seconds=AI_REPLY_POLL_SECONDS)
+
+def poll_ai_reply(supabase: Client, post_id: str, timeout: float = AI_JOB_WAIT_SECONDS):
+    """Check once for a queued post's AI reply, for fragments rerunning on a timer.
+
+    Returns (reply data or None, whether to keep checking). Found replies are
+    kept in st.session_state.ai_responses; checks stop `timeout` seconds
+    after the first one.
+    """
+    replies = st.session_state.setdefault("ai_responses", {})
+    if post_id in replies:
+        return replies[post_id], False
+
+    deadlines = st.session_state.setdefault("ai_reply_poll_deadlines", {})
+    deadline = deadlines.setdefault(post_id, time.monotonic() + timeout)
+    if time.monotonic() > deadline:
+        return None, False
+
+    ai_data = get_ai_replies_for_posts(supabase, [post_id]).get(post_id)
+    if ai_data:
+        replies[post_id] = ai_data
+        return ai_data, False
+    return None, True
+
+def _utc_in(seconds: float):
+    """ISO timestamp `seconds` from now, in UTC"""
+    return (datetime.now(timezone.utc) + timedelta(seconds=seconds)).isoformat()
+
+class AIReplyWorkerPool:
+    """Background threads that turn queued jobs into AI comments.
+
+    Jobs live in the ai_reply_jobs table, so they survive restarts. Workers
+    claim them through the claim_ai_reply_jobs() RPC (FOR UPDATE SKIP LOCKED,
+    with a lease so jobs held by a crashed worker get picked up again), and
+    failed replies are retried with exponential backoff.
+
+    `get_client` is called on every poll, so workers follow the shared client
+    when init_supabase() replaces a dead one instead of keeping the first.
+    """
+
+    def __init__(self, get_client=init_supabase, workers: int = AI_JOB_WORKERS, poll_interval: float = AI_JOB_POLL_INTERVAL):
+        self.get_client = get_client
+        self.poll_interval = poll_interval
+        self._wake = threading.Event()
+        self._threads = [
+            threading.Thread(target=self._run, name=f"ai-job-worker-{i}", daemon=True)
+            for i in range(max(1, workers))
+        ]
+
+    def start(self):
+        """Start the worker threads"""
+        for thread in self._threads:
+            thread.start()
+        return self
+
+    def wake(self):
+        """Tell idle workers there is new work"""
+        self._wake.set()
+
+    def _run(self):
+        """Worker loop: claim a job, process it, sleep when the queue is empty"""
+        while True:
+            supabase, job = None, None
+            try:
+                supabase = self.get_client()
+                if supabase is None:
+                    logger.warning("No database connection for AI reply jobs")
+                else:
+                    job = self._claim(supabase)
+            except Exception:
+                logger.exception("Error claiming AI reply job")
+
+            if job is None:
+                self._wake.wait(self.poll_interval)
+                self._wake.clear()
+                continue
+
+            try:
+                self._process(supabase, job)
+            except Exception as e:
+                logger.exception("AI reply job %s crashed", job["id"])
+                try:
+                    self._retry_or_fail(supabase, job, str(e))
+                except Exception:
+                    # The lease runs out and another worker picks the job up again
+                    logger.exception("Error rescheduling AI reply job %s", job["id"])
+
+    def _claim(self, supabase: Client):
+        """Claim the next due job, or None"""
+        result = supabase.rpc("claim_ai_reply_jobs", {"batch_size": 1, "lease_seconds": AI_JOB_LEASE_SECONDS}).execute()
+        return result.data[0] if result.data else None
+
+    def _process(self, supabase: Client, job: dict):
+        """Generate and store the AI comment for a job's post"""
+        post_id = job["post_id"]
+
+        # A previous attempt may have stored the reply before dying
+        if not get_ai_replies_for_posts(supabase, [post_id]):
+            post = supabase.table("posts").select("content").eq("id", post_id).execute()
+            if not post.data:
+                # Post was deleted while queued
+                self._finish(supabase, job, "done")
+                return
+
+            reply = get_ai_reply(post.data[0]["content"], job["mode"])
+            if is_ai_fallback(reply):
+                self._retry_or_fail(supabase, job, reply)
+                return
+            if not create_ai_comment(supabase, post_id, reply, job["mode"]):
+                self._retry_or_fail(supabase, job, "Could not store AI comment")
+                return
+
+        self._finish(supabase, job, "done")
+
+    def _retry_or_fail(self, supabase: Client, job: dict, error: str):
+        """Put a job back in the queue with backoff, or give up after the last attempt"""
+        if job["attempts"] >= AI_JOB_MAX_ATTEMPTS:
+            self._finish(supabase, job, "failed", error)
+            return
+        backoff = min(300, 10 * 2 ** (job["attempts"] - 1))
+        supabase.table("ai_reply_jobs").update({
+            "status": "pending",
+            "last_error": error[:500],
+            "run_after": _utc_in(backoff),
+            "locked_until": None
+        }).eq("id", job["id"]).execute()
+
+    def _finish(self, supabase: Client, job: dict, status: str, error: str = None):
+        """Mark a job done or failed"""
+        supabase.table("ai_reply_jobs").update({
+            "status": status,
+            "last_error": error[:500] if error else None,
+            "locked_until": None
+        }).eq("id", job["id"]).execute()
+
+@st.cache_resource(show_spinner=False)
+def get_ai_worker_pool():
+    """Start the worker pool once per process"""
+    return AIReplyWorkerPool().start()
@@ -1,62 +1,319 @@
 import os
+import time
+import random
+import threading
+from email.utils import parsedate_to_datetime
 import requests
+from requests.adapters import HTTPAdapter
 import streamlit as st
 from dotenv import load_dotenv
 import json
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError as FuturesTimeoutError
+from reply_cache import get_reply_cache
+from dedup import find_similar_reply, index_post_text
+from moderation import moderate_many
+from metrics import timed
 
 load_dotenv()
 
-def get_ai_reply(post_text: str, mode: str = "funny"):
-    """Generate AI reply to a post using OpenRouter API"""
-    api_key = os.getenv("OPENROUTER_API_KEY") or st.secrets.get("OPENROUTER_API_KEY")
-    
-    if not api_key:
-        return "🤖 AI is taking a coffee break... (API key not configured)"
-    
-    # Define different response modes with optimized prompts for Mistral Small
-    mode_prompts = {
-        "funny": "You are a witty and humorous AI friend. Reply to this confession with light humor and supportive wit. Keep it friendly and funny:",
-        "helpful": "You are a supportive counselor. Reply to this confession with genuine, practical advice and empathy. Be constructive and encouraging:",
-        "poetic": "You are a creative poet. Reply to this confession using beautiful, metaphorical language and artistic expression:",
-        "sarcastic": "You are a playfully sarcastic friend. Reply with gentle, good-natured sarcasm while still being supportive. Don't be mean:",
-        "wise": "You are a wise mentor. Reply to this confession with deep insight, wisdom, and thoughtful perspective:",
-        "chaotic": "You are an unhinged but caring friend. Reply in the most chaotic, random way possible while still being supportive and positive:"
-    }
-    
-    headers = {
-        "Authorization": f"Bearer {api_key}",
-        "Content-Type": "application/json"
-    }
-    
-    data = {
-        "model": "mistralai/mistral-small-3.2-24b-instruct:free",
+OPENROUTER_URL = os.getenv("OPENROUTER_URL", "https://openrouter.ai/api/v1/chat/completions")
+OPENROUTER_MODEL = os.getenv("OPENROUTER_MODEL", "mistralai/mistral-small-3.2-24b-instruct:free")
+
+# Concurrency settings for generating feed replies in parallel
+AI_REPLY_CONCURRENCY = int(os.getenv("AI_REPLY_CONCURRENCY", "8"))
+AI_REPLY_PAGE_DEADLINE = float(os.getenv("AI_REPLY_PAGE_DEADLINE", "45"))
+
+# Define different response modes with optimized prompts for Mistral Small
+MODE_PROMPTS = {
+    "funny": "You are a witty and humorous AI friend. Reply to this confession with light humor and supportive wit. Keep it friendly and funny:",
+    "helpful": "You are a supportive counselor. Reply to this confession with genuine, practical advice and empathy. Be constructive and encouraging:",
+    "poetic": "You are a creative poet. Reply to this confession using beautiful, metaphorical language and artistic expression:",
+    "sarcastic": "You are a playfully sarcastic friend. Reply with gentle, good-natured sarcasm while still being supportive. Don't be mean:",
+    "wise": "You are a wise mentor. Reply to this confession with deep insight, wisdom, and thoughtful perspective:",
+    "chaotic": "You are an unhinged but caring friend. Reply in the most chaotic, random way possible while still being supportive and positive:"
+}
+
+# Every fallback reply starts with this, so callers can tell it from a real reply
+AI_FALLBACK_PREFIX = "🤖 AI is"
+
+def is_ai_fallback(reply: str):
+    """Whether a reply is one of the fallback messages rather than a real reply"""
+    return not reply or reply.startswith(AI_FALLBACK_PREFIX)
+
+class OpenRouterError(Exception):
+    """Raised when OpenRouter can't produce a completion"""
+
+    def __init__(self, message: str, status_code: int = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+class CircuitOpenError(OpenRouterError):
+    """Raised without calling OpenRouter while the circuit breaker is open"""
+
+class OpenRouterClient:
+    """Reusable OpenRouter client.
+
+    Keeps a pool of keep-alive connections so replies skip the TCP/TLS
+    handshake, retries transient failures with jittered exponential backoff
+    (following Retry-After on 429/503), and trips a circuit breaker after
+    repeated failures so callers fail fast while the upstream is down.
+    """
+
+    RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+    def __init__(self, api_key: str, timeout: float = 30, max_retries: int = 3,
+                 backoff_base: float = 0.5, backoff_max: float = 8.0,
+                 failure_threshold: int = 5, reset_timeout: float = 30.0,
+                 pool_size: int = AI_REPLY_CONCURRENCY):
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(1, pool_size))
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({
+            "Authorization": f"Bearer {api_key}",
+            "Content-Type": "application/json"
+        })
+
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._trial_in_flight = False
+
+    def chat(self, payload: dict, stream: bool = False, url: str = OPENROUTER_URL):
+        """POST a chat completion and return the successful response"""
+        self._before_call()
+
+        attempt = 0
+        while True:
+            try:
+                response = self.session.post(url, json=payload, timeout=self.timeout, stream=stream)
+            except requests.RequestException as e:
+                error = OpenRouterError(str(e))
+                delay = self._backoff(attempt)
+            else:
+                if response.status_code == 200:
+                    self._record_success()
+                    return response
+                if response.status_code not in self.RETRY_STATUSES:
+                    # Bad request, auth or quota problems won't fix themselves with a retry
+                    self._record_success()
+                    raise OpenRouterError(f"OpenRouter returned {response.status_code}", response.status_code)
+                error = OpenRouterError(f"OpenRouter returned {response.status_code}", response.status_code)
+                delay = self._retry_after(response)
+                if delay is None:
+                    delay = self._backoff(attempt)
+                response.close()
+
+            attempt += 1
+            if attempt > self.max_retries or delay > self.backoff_max:
+                self._record_failure()
+                raise error
+            time.sleep(delay)
+
+    def _backoff(self, attempt: int):
+        """Full-jitter exponential backoff"""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def _retry_after(self, response):
+        """Seconds to wait from a Retry-After header on 429/503, if present"""
+        if response.status_code not in (429, 503):
+            return None
+        value = response.headers.get("Retry-After")
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+
+    def _before_call(self):
+        """Fail fast while the circuit is open, letting one trial call through after the cooldown"""
+        with self._lock:
+            if self._opened_at is None:
+                return
+            if time.monotonic() - self._opened_at < self.reset_timeout or self._trial_in_flight:
+                raise CircuitOpenError("OpenRouter is unavailable, retrying shortly")
+            self._trial_in_flight = True
+
+    def _record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def _record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self._opened_at is not None or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+def get_openrouter_client(api_key: str):
+    """Get the shared OpenRouter client for this API key"""
+    with _clients_lock:
+        client = _clients.get(api_key)
+        if client is None:
+            client = _clients[api_key] = OpenRouterClient(api_key)
+        return client
+
+def get_openrouter_api_key():
+    """Read the OpenRouter API key from the environment or Streamlit secrets"""
+    return os.getenv("OPENROUTER_API_KEY") or st.secrets.get("OPENROUTER_API_KEY")
+
+def build_reply_payload(post_text: str, mode: str):
+    """Build the chat completion request for a reply in the given mode"""
+    return {
+        "model": OPENROUTER_MODEL,
         "messages": [
-            {"role": "user", "content": f"{mode_prompts.get(mode, mode_prompts['funny'])}\n\nConfession: '{post_text}'\n\nReply in 1 sentence:"}
+            {"role": "user", "content": f"{MODE_PROMPTS.get(mode, MODE_PROMPTS['funny'])}\n\nConfession: '{post_text}'\n\nReply in 1 sentence:"}
         ],
         "max_tokens": 100,  # Limit response length for conciseness
         "temperature": 0.75,  # Adjusted for consistent creativity
         "top_p": 1.0,  # Ensure diverse responses
         "frequency_penalty": 0.0  # Avoid repetition
     }
+
+@timed("ai.get_ai_reply", is_error=is_ai_fallback)
+def get_ai_reply(post_text: str, mode: str = "funny"):
+    """Generate AI reply to a post using OpenRouter API"""
+    # Reuse a reply generated for the same text, or a near-identical one, in any session
+    cache = get_reply_cache()
+    cached_reply = cache.get(post_text, mode, OPENROUTER_MODEL) or find_similar_reply(post_text, mode, OPENROUTER_MODEL)
+    if cached_reply:
+        return cached_reply
+
+    api_key = get_openrouter_api_key()
+    
+    if not api_key:
+        return "🤖 AI is taking a coffee break... (API key not configured)"
     
     try:
-        response = requests.post(
-            "https://openrouter.ai/api/v1/chat/completions", 
-            json=data, 
-            headers=headers,
-            timeout=30
-        )
-        
-        if response.status_code == 200:
-            result = response.json()
-            # Return single response without alternatives
-            return result["choices"][0]["message"]["content"].strip()
-        else:
-            return f"🤖 AI is having technical difficulties... (Error {response.status_code})"
-            
+        response = get_openrouter_client(api_key).chat(build_reply_payload(post_text, mode))
+        result = response.json()
+        # Return single response without alternatives
+        reply = result["choices"][0]["message"]["content"].strip()
+        cache.set(post_text, mode, OPENROUTER_MODEL, reply)
+        index_post_text(post_text)
+        return reply
+    except CircuitOpenError:
+        return "🤖 AI is temporarily offline... (taking a breather, try again shortly)"
+    except OpenRouterError as e:
+        if e.status_code:
+            return f"🤖 AI is having technical difficulties... (Error {e.status_code})"
+        return f"🤖 AI is temporarily offline... ({str(e)[:50]})"
     except Exception as e:
         return f"🤖 AI is temporarily offline... ({str(e)[:50]})"
 
+def stream_ai_reply(post_text: str, mode: str = "funny"):
+    """Generate AI reply to a post, yielding tokens as OpenRouter streams them"""
+    cache = get_reply_cache()
+    cached_reply = cache.get(post_text, mode, OPENROUTER_MODEL) or find_similar_reply(post_text, mode, OPENROUTER_MODEL)
+    if cached_reply:
+        yield cached_reply
+        return
+
+    api_key = get_openrouter_api_key()
+
+    if not api_key:
+        yield "🤖 AI is taking a coffee break... (API key not configured)"
+        return
+
+    payload = build_reply_payload(post_text, mode)
+    payload["stream"] = True
+
+    tokens = []
+    try:
+        response = get_openrouter_client(api_key).chat(payload, stream=True)
+        with response:
+            # Server-sent events: "data: {...}" lines, ending with "data: [DONE]".
+            # Decoded here because requests assumes ISO-8859-1 for text/event-stream
+            # without a charset, which would mangle accents and emoji
+            for raw_line in response.iter_lines():
+                line = raw_line.decode("utf-8")
+                if not line or not line.startswith("data:"):
+                    continue
+                data = line[len("data:"):].strip()
+                if data == "[DONE]":
+                    break
+                chunk = json.loads(data)
+                token = chunk["choices"][0].get("delta", {}).get("content")
+                if token:
+                    tokens.append(token)
+                    yield token
+    except CircuitOpenError:
+        if not tokens:
+            yield "🤖 AI is temporarily offline... (taking a breather, try again shortly)"
+        return
+    except OpenRouterError as e:
+        if not tokens:
+            if e.status_code:
+                yield f"🤖 AI is having technical difficulties... (Error {e.status_code})"
+            else:
+                yield f"🤖 AI is temporarily offline... ({str(e)[:50]})"
+        return
+    except Exception as e:
+        if not tokens:
+            yield f"🤖 AI is temporarily offline... ({str(e)[:50]})"
+        return
+
+    reply = "".join(tokens).strip()
+    if reply:
+        cache.set(post_text, mode, OPENROUTER_MODEL, reply)
+        index_post_text(post_text)
+
+def write_ai_reply_stream(placeholder, post_text: str, mode: str, render):
+    """Stream a reply into a Streamlit placeholder and return the final text.
+
+    `render` turns the reply text so far into the HTML to show.
+    """
+    reply = ""
+    for token in stream_ai_reply(post_text, mode):
+        reply += token
+        placeholder.markdown(render(reply + " ▌"), unsafe_allow_html=True)
+    reply = reply.strip()
+    placeholder.markdown(render(reply), unsafe_allow_html=True)
+    return reply
+
+def get_ai_replies(posts: dict, mode: str = "wise", max_workers: int = None, deadline: float = None):
+    """Generate AI replies for many posts in parallel.
+
+    Takes a {post_id: post_text} dict and yields (post_id, reply) pairs as each
+    reply finishes. Replies still pending when the deadline runs out are dropped.
+    """
+    if not posts:
+        return
+
+    max_workers = max(1, min(max_workers or AI_REPLY_CONCURRENCY, len(posts)))
+    deadline = deadline if deadline is not None else AI_REPLY_PAGE_DEADLINE
+
+    executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ai-reply")
+    futures = {
+        executor.submit(get_ai_reply, text, mode): post_id
+        for post_id, text in posts.items()
+    }
+    try:
+        for future in as_completed(futures, timeout=deadline):
+            yield futures[future], future.result()
+    except FuturesTimeoutError:
+        # Out of time for this page, whatever is still running gets dropped
+        pass
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
 def get_random_ai_encouragement():
     """Get a random encouraging message"""
     encouragements = [
@@ -74,19 +331,6 @@ def get_random_ai_encouragement():
     return random.choice(encouragements)
 
 def moderate_content(text: str):
-    """Basic content moderation (can be enhanced)"""
-    # Simple keyword filtering - can be made more sophisticated
-    banned_words = ["hate", "kill", "die", "suicide"]  # Add more as needed
-    
-    text_lower = text.lower()
-    for word in banned_words:
-        if word in text_lower:
-            return False, f"Content contains inappropriate language: '{word}'"
-    
-    if len(text) > 2000:
-        return False, "Content is too long (max 2000 characters)"
-    
-    if len(text.strip()) < 3:
-        return False, "Content is too short"
-    
-    return True, "Content approved"
+    """Basic content moderation against the banned term list"""
+    is_appropriate, message, _ = moderate_many([text])[0]
+    return is_appropriate, message
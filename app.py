@@ -1,8 +1,14 @@
 import streamlit as st
 import uuid
 from datetime import datetime
-from supabase_config import init_supabase, create_post, get_posts
-from ai_utils import get_ai_reply, get_random_ai_encouragement
+from supabase_config import get_anon_id, create_ai_comment, get_ai_replies_for_posts, get_reaction_buffer
+from storage import get_storage_backend
+from feed_state import load_feed, get_page, render_page_controls, refresh_feed
+from card_render import format_times_ago, post_card_html, ai_reply_html, ai_status_html
+from ai_utils import get_ai_replies, write_ai_reply_stream, is_ai_fallback, get_random_ai_encouragement
+import metrics
+from ai_jobs import enqueue_ai_reply, get_open_ai_jobs, is_ai_job_due, poll_ai_reply, get_ai_worker_pool, AI_REPLY_POLL_SECONDS
+from retention import get_retention_worker
 
 # Page config
 st.set_page_config(
@@ -79,6 +85,9 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+FEED_KEY = "main_feed_posts"
+FEED_PAGE_SIZE = 20
+
 def main():
     # Initialize all session state variables
     if 'posts_count' not in st.session_state:
@@ -92,11 +101,16 @@ def main():
     if 'current_ai_response' not in st.session_state:
         st.session_state.current_ai_response = None
     
-    # Initialize Supabase
-    supabase = init_supabase()
-    if not supabase:
+    # Initialize storage, Supabase or a local SQLite database
+    storage = get_storage_backend()
+    if not storage:
         st.error("Failed to connect to database. Please check your configuration.")
         return
+    supabase = storage.client
+
+    # Make sure queued AI replies keep getting processed and old posts purged
+    get_ai_worker_pool()
+    get_retention_worker()
 
     # Header
     st.markdown('<h1 class="main-header">🧠 Unfiltered Club</h1>', unsafe_allow_html=True)
@@ -131,57 +145,37 @@ def main():
         col1, col2 = st.columns(2)
         
         with col1:
-            if st.button("🤖 Get AI Response", use_container_width=True):
-                if confession.strip():
-                    with st.spinner("🤖 AI is thinking..."):
-                        ai_response = get_ai_reply(confession, ai_mode)
-
-                    if ai_response:
-                        st.markdown("### 🤖 AI Response:")
-                        st.markdown(f"""
-                            <div style="background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); 
-                                        color: white; padding: 1rem; border-radius: 10px; margin: 1rem 0;">
-                                <strong>{ai_mode.title()} AI:</strong> {ai_response}
-                            </div>
-                        """, unsafe_allow_html=True)
-
-                    else:
-                        st.warning("Write something first!")
-        
+            get_response_clicked = st.button("🤖 Get AI Response", use_container_width=True)
         with col2:
             # Post button
-            if st.button("🚀 Post & Get AI Reply", use_container_width=True):
-                if confession.strip():
-                    # Generate AI reply first
-                    with st.spinner("🤖 AI is crafting a response..."):
-                        ai_response = get_ai_reply(confession, ai_mode)
-                        st.session_state.current_ai_response = ai_response
+            post_clicked = st.button("🚀 Post & Get AI Reply", use_container_width=True)
+
+        if (get_response_clicked or post_clicked) and not confession.strip():
+            st.warning("Write something first! Even 'blah' counts as authentic expression.")
+
+        elif get_response_clicked:
+            st.markdown("### 🤖 AI Response:")
+            # Stream the reply in token by token
+            write_ai_reply_stream(st.empty(), confession, ai_mode, lambda text: ai_response_box(ai_mode, text))
+
+        elif post_clicked:
+            # Save the confession right away, the AI reply is written in the background
+            mood_clean = mood.split(" ")[1]  # Extract just the word
+            post = storage.create_post(confession, mood_clean, get_anon_id())
+            
+            if post:
+                enqueue_ai_reply(supabase, post['id'], ai_mode)
+                st.success("🎉 Confession posted! 🤖 AI is crafting a response...")
                 
-                    # Create post
-                    mood_clean = mood.split(" ")[1]  # Extract just the word
-                    post = create_post(supabase, confession, mood_clean)
-                    
-                    if post:
-                        # Store AI response for this post
-                        st.session_state.ai_responses[post['id']] = {
-                            'response': ai_response,
-                            'mode': ai_mode
-                        }
-                        
-                        # Create AI comment
-                        if ai_response:
-                            create_comment(supabase, post["id"], f"🤖 AI ({ai_mode}): {ai_response}", "ai_bot")
-                            st.success("🎉 Confession posted with AI response!")
-                        
-                        # Increment posts count
-                        st.session_state.posts_count += 1
+                # Increment posts count
+                st.session_state.posts_count += 1
+
+                # Pull the new confession into the top of the feed
+                refresh_feed(supabase, FEED_KEY)
 
-                        # Don't rerun immediately so user can see the AI response
-                        st.info("👀 Check out the main feed below to see your confession live!")
-                    else:
-                        st.error("Failed to post confession. Try again!")
+                st.info("👀 Check out the main feed below to see your confession live!")
             else:
-                st.warning("Write something first! Even 'blah' counts as authentic expression.")
+                st.error("Failed to post confession. Try again!")
         
         st.markdown("---")
         st.markdown("💡 **Tip**: Be real, be raw, be you. This is your safe space.")
@@ -194,106 +188,124 @@ def main():
     col1, col2, col3 = st.columns([1, 1, 1])
     with col2:
         if st.button("🔄 Refresh Feed", use_container_width=True):
+            # Only fetch what was posted since the last load
+            refresh_feed(supabase, FEED_KEY)
             st.rerun()
 
-    # Get and display posts
-    posts = get_posts(supabase, limit=50)
-    
-    if not posts:
+    # Get posts, more pages load on demand and only the visible page is rendered
+    if not load_feed(supabase, FEED_KEY, FEED_PAGE_SIZE):
         st.info("🌱 Be the first to share something!")
         return
-        
-    for post in posts:
-        with st.container():
-            st.markdown(f"""
-            <div class="post-card">
-                <span class="mood-tag mood-{post['mood']}">{post['mood'].upper()}</span>
-                <p>{post['content']}</p>
-                <div class="timestamp">Posted {format_time_ago(post['created_at'])}</div>
-            </div>
-            """, unsafe_allow_html=True)
+    posts = get_page(FEED_KEY)
 
-            # Get AI response for this post if not already in session state
-            if post['id'] not in st.session_state.ai_responses:
-                ai_response = get_ai_reply(post['content'], "wise")
-                st.session_state.ai_responses[post['id']] = {
-                    'response': ai_response,
-                    'mode': 'wise'
-                }
-            
-            # Display AI response if it exists
-            if 'ai_responses' in st.session_state and post['id'] in st.session_state.ai_responses:
-                ai_data = st.session_state.ai_responses[post['id']]
-                st.markdown(f"""
-                <div class="ai-reply">
-                    AI ({ai_data['mode']}): {ai_data['response']}
-                </div>
-                """, unsafe_allow_html=True)
+    # Reuse AI replies already stored as comments, one query for the whole page
+    missing_ids = [post['id'] for post in posts if post['id'] not in st.session_state.ai_responses]
+    st.session_state.ai_responses.update(get_ai_replies_for_posts(supabase, missing_ids))
+
+    # Replies the background workers are still writing
+    queued_jobs = get_open_ai_jobs(supabase, [post_id for post_id in missing_ids if post_id not in st.session_state.ai_responses])
+
+    # Posts still waiting on an AI response: {post_id: content}
+    pending_replies = {}
+
+    # Card slots, so AI replies can be filled in as they arrive: {post_id: (slot, card_html)}
+    cards = {}
+
+    # Relative timestamps for the whole page in one pass
+    times_ago = format_times_ago(post['created_at'] for post in posts)
+
+    with metrics.timer("render.feed"):
+        for post, time_ago in zip(posts, times_ago):
+            with st.container():
+                # Card and AI response go out as one element, missing replies are fetched below
+                card_html = post_card_html(post, time_ago)
+                job = queued_jobs.get(post['id'])
+                if post['id'] in st.session_state.ai_responses:
+                    render_card(st.empty(), card_html, ai_data=st.session_state.ai_responses[post['id']])
+                elif job and is_ai_job_due(job):
+                    # Checks for the reply on its own timer, the page doesn't wait
+                    render_queued_card(supabase, post['id'], card_html)
+                elif job:
+                    render_card(st.empty(), card_html, status="🤖 AI hit a snag and will retry shortly... refresh to see the reply")
+                else:
+                    card_slot = st.empty()
+                    cards[post['id']] = (card_slot, card_html)
+                    render_card(card_slot, card_html, status="🤖 AI is thinking...")
+                    pending_replies[post['id']] = post['content']
             
-            # Reaction buttons
-            col1, col2, col3, col4 = st.columns(4)
-            with col1:
-                st.button("❤️", key=f"love_{post['id']}")
-            with col2:
-                st.button("😂", key=f"laugh_{post['id']}")
-            with col3:
-                st.button("🤝", key=f"support_{post['id']}")
-            with col4:
-                st.button("🔥", key=f"fire_{post['id']}")
+                # Reactions and comments rerun on their own, not the whole feed
+                render_post_actions(storage, post)
         
-        # Comment section
-        with st.expander("💬 Add Anonymous Comment"):
-            comment_text = st.text_area(
-                "Your anonymous comment:",
-                key=f"comment_{post['id']}",
-                placeholder="Share your thoughts, support, or just say 'felt that'..."
-            )
-            
-            if st.button("Post Comment", key=f"post_comment_{post['id']}"):
-                if comment_text.strip():
-                    from supabase_config import create_comment
-                    create_comment(supabase, post['id'], comment_text)
-                    st.success("Comment posted anonymously!")
-                    
-                    # Increment session state for comments count
-                    if 'comments_count' not in st.session_state:
-                        st.session_state.comments_count = 0
-                    st.session_state.comments_count += 1
+            st.markdown("---")
 
-                    st.rerun()
-        
-        st.markdown("---")
+    # Generate replies for posts that never got one, in parallel, and fill each
+    # card as they arrive. Real replies are stored so no one generates them again.
+    for post_id, ai_response in get_ai_replies(pending_replies, "wise"):
+        ai_data = {'response': ai_response, 'mode': 'wise'}
+        st.session_state.ai_responses[post_id] = ai_data
+        del pending_replies[post_id]
+        render_card(*cards[post_id], ai_data=ai_data)
+        if not is_ai_fallback(ai_response):
+            create_ai_comment(supabase, post_id, ai_response, 'wise')
 
-def format_time_ago(timestamp):
-    """Format timestamp to 'X time ago' format"""
-    try:
-        from datetime import datetime, timezone
-        import re
-        
-        # Parse the timestamp
-        if isinstance(timestamp, str):
-            # Remove timezone info if present and parse
-            clean_timestamp = re.sub(r'\+\d{2}:\d{2}$', '', timestamp)
-            dt = datetime.fromisoformat(clean_timestamp)
-        else:
-            dt = timestamp
-        
-        # Calculate time difference
-        now = datetime.now()
-        diff = now - dt
+    # Anything left missed the page deadline, it will be retried on the next rerun
+    for post_id in pending_replies:
+        render_card(*cards[post_id], status="🤖 AI is still thinking... refresh to see the reply")
+
+    render_page_controls(supabase, FEED_KEY)
+
+@st.fragment(run_every=AI_REPLY_POLL_SECONDS)
+def render_queued_card(supabase, post_id, card_html):
+    """Post card whose AI reply a background worker is writing; reruns on its own until the reply shows up"""
+    ai_data, waiting = poll_ai_reply(supabase, post_id)
+    if ai_data:
+        render_card(st.empty(), card_html, ai_data=ai_data)
+    elif waiting:
+        render_card(st.empty(), card_html, status="🤖 AI is crafting a response...")
+    else:
+        render_card(st.empty(), card_html, status="🤖 AI is still thinking... refresh to see the reply")
+
+@st.fragment
+def render_post_actions(storage, post):
+    """Reaction buttons and comment box for one post card"""
+    # Reaction buttons
+    reactions = [("❤️", "love"), ("😂", "laugh"), ("🤝", "support"), ("🔥", "fire")]
+    for col, (emoji, name) in zip(st.columns(4), reactions):
+        with col:
+            if st.button(emoji, key=f"{name}_{post['id']}"):
+                get_reaction_buffer(storage.client).add(post['id'], emoji, get_anon_id())
+                st.session_state.reactions_count += 1
+
+    # Comment section
+    with st.expander("💬 Add Anonymous Comment"):
+        comment_text = st.text_area(
+            "Your anonymous comment:",
+            key=f"comment_{post['id']}",
+            placeholder="Share your thoughts, support, or just say 'felt that'..."
+        )
         
-        if diff.days > 0:
-            return f"{diff.days} day{'s' if diff.days > 1 else ''}"
-        elif diff.seconds > 3600:
-            hours = diff.seconds // 3600
-            return f"{hours} hour{'s' if hours > 1 else ''}"
-        elif diff.seconds > 60:
-            minutes = diff.seconds // 60
-            return f"{minutes} minute{'s' if minutes > 1 else ''}"
-        else:
-            return "just now"
-    except:
-        return "some time"
+        if st.button("Post Comment", key=f"post_comment_{post['id']}"):
+            if comment_text.strip():
+                storage.create_comment(post['id'], comment_text, get_anon_id())
+                st.success("Comment posted anonymously!")
+                
+                # Increment session state for comments count
+                st.session_state.comments_count += 1
+
+def ai_response_box(ai_mode, text):
+    """HTML for the AI response box shown in the sidebar"""
+    return f"""
+        <div style="background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); 
+                    color: white; padding: 1rem; border-radius: 10px; margin: 1rem 0;">
+            <strong>{ai_mode.title()} AI:</strong> {text}
+        </div>
+    """
+
+def render_card(slot, card_html, ai_data=None, status=None):
+    """Render a post card and its AI response (or status) into its slot"""
+    reply_html = ai_reply_html(ai_data) if ai_data else ai_status_html(status)
+    slot.markdown(card_html + reply_html, unsafe_allow_html=True)
 
 if __name__ == "__main__":
     main()
+    metrics.render_debug_panel()
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Export and import posts, comments and reactions.
+
+Tables are paged through with keyset pagination and streamed to one file
+per table, so memory stays bounded by the page size however big the tables
+are. Imports insert in large batches. Profile counters are rebuilt by the
+database triggers as rows come in.
+
+    python backup.py export backups/2026-10-18
+    python backup.py export backups/2026-10-18 --format parquet
+    python backup.py import backups/2026-10-18
+
+Parquet needs pyarrow (pip install pyarrow).
+"""
+
+import os
+import json
+import argparse
+from supabase import Client
+from dotenv import load_dotenv
+from metrics import timed
+from supabase_config import init_supabase, _keyset_filter
+
+load_dotenv()
+
+# Rows fetched per export page and written per import request
+BACKUP_PAGE_SIZE = int(os.getenv("BACKUP_PAGE_SIZE", "1000"))
+BACKUP_BATCH_SIZE = int(os.getenv("BACKUP_BATCH_SIZE", "500"))
+
+# Exported tables and columns, parents before children so imports satisfy foreign keys
+BACKUP_TABLES = {
+    "posts": ("id", "content", "user_id", "mood", "created_at", "updated_at"),
+    "comments": ("id", "post_id", "content", "user_id", "is_ai", "ai_mode", "created_at", "updated_at"),
+    "reactions": ("id", "post_id", "emoji", "user_id", "created_at")
+}
+# Unique keys besides id that imported rows may already occupy; a user's
+# reaction to a post is one row whatever its id
+CONFLICT_COLUMNS = {"reactions": "post_id,user_id"}
+BOOLEAN_COLUMNS = {"is_ai"}
+FORMATS = ("ndjson", "parquet")
+
+def iter_table_pages(supabase: Client, table: str, page_size: int = BACKUP_PAGE_SIZE):
+    """Yield a table's rows a page at a time, newest first, keyset paged on (created_at, id)"""
+    columns = BACKUP_TABLES[table]
+    cursor = None
+    while True:
+        query = supabase.table(table).select(",".join(columns))
+        if cursor:
+            # The plain bound lets the index seek to the cursor; the `or`
+            # filter then drops ties already exported
+            query = query.lte("created_at", cursor[0]).or_(_keyset_filter(["created_at", "id"], cursor))
+        rows = query.order("created_at", desc=True).order("id", desc=True).limit(page_size).execute().data or []
+        if rows:
+            yield rows
+        if len(rows) < page_size:
+            return
+        cursor = (rows[-1]["created_at"], rows[-1]["id"])
+
+def _parquet_schema(table: str):
+    import pyarrow as pa
+    return pa.schema([
+        (column, pa.bool_() if column in BOOLEAN_COLUMNS else pa.string())
+        for column in BACKUP_TABLES[table]
+    ])
+
+@timed("backup.export_table")
+def export_table(supabase: Client, table: str, path: str, fmt: str = "ndjson", page_size: int = BACKUP_PAGE_SIZE, progress=None):
+    """Stream one table to an NDJSON or Parquet file; returns the number of rows written"""
+    written = 0
+    if fmt == "parquet":
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        schema = _parquet_schema(table)
+        with pq.ParquetWriter(path, schema) as writer:
+            for rows in iter_table_pages(supabase, table, page_size):
+                writer.write_table(pa.Table.from_pylist(rows, schema=schema))
+                written += len(rows)
+                if progress:
+                    progress(table, written)
+        return written
+
+    with open(path, "w", encoding="utf-8") as f:
+        for rows in iter_table_pages(supabase, table, page_size):
+            f.writelines(json.dumps(row, ensure_ascii=False) + "\n" for row in rows)
+            written += len(rows)
+            if progress:
+                progress(table, written)
+    return written
+
+def iter_file_batches(path: str, batch_size: int = BACKUP_BATCH_SIZE):
+    """Yield rows from an NDJSON or Parquet export a batch at a time"""
+    if path.endswith(".parquet"):
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=batch_size):
+            yield batch.to_pylist()
+        return
+
+    batch = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                batch.append(json.loads(line))
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+    if batch:
+        yield batch
+
+@timed("backup.import_table")
+def import_table(supabase: Client, table: str, path: str, batch_size: int = BACKUP_BATCH_SIZE, progress=None):
+    """Insert a table's export in batches; returns the number of rows inserted.
+
+    Rows whose id already exists are skipped, so an interrupted import can
+    simply be run again. So are reactions by a user who already reacted to
+    the post. Skipped rows don't count as inserted.
+    """
+    sent = inserted = 0
+    on_conflict = CONFLICT_COLUMNS.get(table, "id")
+    for rows in iter_file_batches(path, batch_size):
+        # With ignore_duplicates only the rows actually inserted come back
+        result = supabase.table(table).upsert(rows, on_conflict=on_conflict, ignore_duplicates=True).execute()
+        inserted += len(result.data or [])
+        sent += len(rows)
+        if progress:
+            progress(table, sent)
+    return inserted
+
+def export_data(supabase: Client, directory: str, fmt: str = "ndjson", page_size: int = BACKUP_PAGE_SIZE, progress=None):
+    """Export every table into `directory`; returns rows written per table"""
+    os.makedirs(directory, exist_ok=True)
+    return {
+        table: export_table(supabase, table, os.path.join(directory, f"{table}.{fmt}"), fmt, page_size, progress)
+        for table in BACKUP_TABLES
+    }
+
+def import_data(supabase: Client, directory: str, batch_size: int = BACKUP_BATCH_SIZE, progress=None):
+    """Import every table found in `directory`; returns rows inserted per table"""
+    counts = {}
+    for table in BACKUP_TABLES:
+        for fmt in FORMATS:
+            path = os.path.join(directory, f"{table}.{fmt}")
+            if os.path.exists(path):
+                counts[table] = import_table(supabase, table, path, batch_size, progress)
+                break
+    return counts
+
+def main():
+    parser = argparse.ArgumentParser(description="Export or import posts, comments and reactions")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    export_parser = subparsers.add_parser("export", help="write every table to a directory")
+    export_parser.add_argument("directory")
+    export_parser.add_argument("--format", choices=FORMATS, default="ndjson")
+    export_parser.add_argument("--page-size", type=int, default=BACKUP_PAGE_SIZE, help="rows fetched per request")
+    import_parser = subparsers.add_parser("import", help="load an exported directory")
+    import_parser.add_argument("directory")
+    import_parser.add_argument("--batch-size", type=int, default=BACKUP_BATCH_SIZE, help="rows inserted per request")
+    args = parser.parse_args()
+
+    supabase = init_supabase()
+    if not supabase:
+        raise SystemExit("Failed to connect to database. Please check your configuration.")
+
+    progress = lambda table, rows: print(f"📦 {table}: {rows:,} rows", end="\r")
+    if args.command == "export":
+        counts = export_data(supabase, args.directory, args.format, args.page_size, progress)
+    else:
+        if not os.path.isdir(args.directory):
+            raise SystemExit(f"No export found at {args.directory}")
+        counts = import_data(supabase, args.directory, args.batch_size, progress)
+
+    print(" " * 40, end="\r")
+    for table, rows in counts.items():
+        print(f"✅ {table}: {rows:,} rows {args.command}ed")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Benchmark the data layer and feed render against local stand-ins.
+
+Runs get_posts, search_posts, get_comments, get_user_stats and a full feed
+render against an in-memory Supabase fake at several table sizes, then times
+a page of AI replies, and the same page reposted with small edits, against a
+local OpenRouter stub. Needs no network access.
+
+    python benchmarks/app_benchmark.py
+    python benchmarks/app_benchmark.py --sizes 10 1000 --ai-latency 0.5 --ai-error-rate 0.2
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+
+# Add project root to path
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+# Fresh reply cache and near-duplicate index; set before the project
+# modules read it on import
+os.environ["AI_REPLY_CACHE_PATH"] = os.path.join(tempfile.mkdtemp(prefix="unfiltered-bench-"), "replies.sqlite3")
+
+from fake_supabase import FakeSupabase, seed
+from stub_openrouter import StubOpenRouter
+
+SIZES = [10, 1_000, 100_000]
+PAGE_SIZE = 20
+CONFESSION_WORDS = (
+    "i feel like nobody notices when work friends coffee tired weekend again really my boss mom dad "
+    "sister roommate dinner cereal meetings sleep anxious lonely happy angry proud scared money rent gym "
+    "phone text ghosted date ex dog cat plants pizza guilty sick job quit school exam deadline late"
+).split()
+
+def measure(client, func, runs, setup=None):
+    """Average milliseconds and round trips per call, after one untimed warm-up call"""
+    func()
+    total = 0.0
+    trips = client.round_trips
+    for _ in range(runs):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        func()
+        total += time.perf_counter() - start
+    return total / runs * 1000, (client.round_trips - trips) / runs
+
+def render_feed(client, sort="latest", mood=None):
+    """Everything a feed rerun does for one page, minus the Streamlit calls"""
+    from supabase_config import get_posts_page, get_ai_replies_for_posts, get_comments_for_posts, count_reactions_for_posts
+    from card_render import format_times_ago, post_card_html, ai_reply_html, ai_status_html
+    from ai_jobs import get_open_ai_jobs
+
+    posts, _ = get_posts_page(client, limit=PAGE_SIZE, sort=sort, mood=mood)
+    post_ids = [post["id"] for post in posts]
+    replies = get_ai_replies_for_posts(client, post_ids)
+    get_open_ai_jobs(client, [post_id for post_id in post_ids if post_id not in replies])
+    get_comments_for_posts(client, post_ids)
+    count_reactions_for_posts(client, post_ids)
+
+    html = []
+    for post, time_ago in zip(posts, format_times_ago(post["created_at"] for post in posts)):
+        card = post_card_html(post, time_ago)
+        ai_data = replies.get(post["id"])
+        html.append(card + (ai_reply_html(ai_data) if ai_data else ai_status_html("🤖 AI is thinking...")))
+    return html
+
+def benchmark_data(sizes, runs, latency):
+    from supabase_config import get_posts, get_posts_page, search_posts, get_comments, get_comments_for_posts, get_user_stats, _fetch_stats
+    from storage import SupabaseBackend, SQLiteBackend
+    import card_render
+
+    print(f"🗄️ Data layer benchmark ({runs} runs each, {latency * 1000:.0f} ms simulated round trip)")
+    print(f"{'posts':>8}  {'operation':<28} {'avg ms':>10} {'trips':>6}")
+
+    for size in sizes:
+        print(f"{size:>8,}  seeding...", end="\r")
+        client = seed(FakeSupabase(latency=latency), size)
+        first_page, cursor = get_posts_page(client, limit=PAGE_SIZE)
+        sample_id = first_page[0]["id"] if first_page else None
+        page_ids = [post["id"] for post in first_page]
+
+        def walk_pages(pages=5):
+            before = None
+            for _ in range(pages):
+                _, before = get_posts_page(client, limit=PAGE_SIZE, before=before)
+                if not before:
+                    break
+
+        cases = [
+            ("get_posts latest", lambda: get_posts(client, limit=PAGE_SIZE), None),
+            ("get_posts 5 pages deep", walk_pages, None),
+            ("get_posts mood filter", lambda: get_posts(client, limit=PAGE_SIZE, mood="sad"), None),
+            ("get_posts most_reacted", lambda: get_posts(client, limit=PAGE_SIZE, sort="most_reacted"), None),
+            ("search_posts", lambda: search_posts(client, "nobody notices", limit=PAGE_SIZE), None),
+            ("get_comments one post", lambda: get_comments(client, sample_id), None),
+            ("get_comments_for_posts page", lambda: get_comments_for_posts(client, page_ids), None),
+            # st.cache_data only caches under `streamlit run`, so this is always the uncached path
+            ("get_user_stats", lambda: get_user_stats(client), _fetch_stats.clear),
+            ("feed render cold", lambda: render_feed(client), card_render._card_cache.clear),
+            ("feed render warm", lambda: render_feed(client), None),
+        ]
+        # The same operations through the storage backends: Supabase pays a
+        # round trip per call, the SQLite backend runs counts and stats as
+        # direct SQL (reads and writes share the supabase_config path)
+        for label, backend in [("supabase", SupabaseBackend(client)), ("sqlite", SQLiteBackend(client=client))]:
+            cases += [
+                (f"{label}.get_posts", lambda b=backend: b.get_posts(limit=PAGE_SIZE), None),
+                (f"{label}.get_comments", lambda b=backend: b.get_comments(sample_id), None),
+                (f"{label}.count_reactions", lambda b=backend: b.count_reactions(sample_id), None),
+                (f"{label}.get_user_stats", lambda b=backend: b.get_user_stats(), _fetch_stats.clear),
+                (f"{label}.add_reaction", lambda b=backend: b.add_reaction(sample_id, "🔥", "bench-user"), None),
+            ]
+
+        for name, func, setup in cases:
+            avg_ms, trips = measure(client, func, runs, setup)
+            print(f"{size:>8,}  {name:<28} {avg_ms:>10.2f} {trips:>6.1f}")
+        print()
+
+def benchmark_ai(stub, posts):
+    from ai_utils import get_ai_replies, is_ai_fallback, AI_REPLY_CONCURRENCY
+
+    print(f"🤖 AI reply benchmark ({posts} posts, {stub.latency * 1000:.0f} ms stub latency, {stub.error_rate:.0%} errors)")
+    rng = random.Random(time.time_ns())
+    texts = {f"post-{i}": " ".join(rng.choice(CONFESSION_WORDS) for _ in range(rng.randint(15, 40))) for i in range(posts)}
+    # The same confessions posted again with a word added
+    reposts = {f"repost-{i}": f"honestly {text}" for i, text in enumerate(texts.values())}
+
+    print(f"{'batch':>8} {'concurrency':>12} {'wall s':>8} {'replies':>8} {'fallbacks':>10} {'missed':>7} {'requests':>9}")
+    for label, batch in [("new", texts), ("reposts", reposts)]:
+        requests = stub.requests
+        start = time.perf_counter()
+        replies = dict(get_ai_replies(batch, "wise"))
+        elapsed = time.perf_counter() - start
+        fallbacks = sum(1 for reply in replies.values() if is_ai_fallback(reply))
+        print(f"{label:>8} {AI_REPLY_CONCURRENCY:>12} {elapsed:>8.2f} {len(replies):>8} {fallbacks:>10} "
+              f"{len(batch) - len(replies):>7} {stub.requests - requests:>9}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline performance benchmarks")
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES, help="post counts to test")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=0.0, help="simulated database round trip, seconds")
+    parser.add_argument("--ai-latency", type=float, default=0.2, help="stub OpenRouter reply time, seconds")
+    parser.add_argument("--ai-error-rate", type=float, default=0.1, help="share of stub requests that fail")
+    parser.add_argument("--ai-posts", type=int, default=PAGE_SIZE)
+    parser.add_argument("--skip-ai", action="store_true")
+    parser.add_argument("--metrics", help="also write the instrumented call metrics here (.json or .prom)")
+    args = parser.parse_args()
+
+    # Keep everything local: stubbed model endpoint
+    stub = StubOpenRouter(latency=args.ai_latency, jitter=args.ai_latency / 4, error_rate=args.ai_error_rate).start()
+    os.environ["OPENROUTER_URL"] = stub.url
+    os.environ["OPENROUTER_API_KEY"] = "benchmark"
+
+    try:
+        benchmark_data(args.sizes, args.runs, args.latency)
+        if not args.skip_ai:
+            benchmark_ai(stub, args.ai_posts)
+    finally:
+        stub.stop()
+
+    if args.metrics:
+        import metrics
+        metrics.export(args.metrics)
+        print(f"\n📈 Call metrics written to {args.metrics}")
+
+if __name__ == "__main__":
+    main()
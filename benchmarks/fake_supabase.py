@@ -0,0 +1,74 @@
+"""
+In-memory stand-in for the Supabase client, for offline benchmarks.
+
+Built on storage.SQLiteClient, which translates the supabase-py query
+builder calls the app uses into SQL against the same tables, view and
+indexes as database_setup.sql, so queries scale the way they would with
+real indexes. Every request counts as one round trip and can be given a
+simulated network delay.
+"""
+
+import os
+import sys
+import time
+import uuid
+import random
+from datetime import datetime, timedelta, timezone
+
+# Add project root to path
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from storage import SQLiteClient
+
+MOODS = ["sad", "angry", "meh", "lol", "happy", "confused"]
+EMOJIS = ["❤️", "😂", "😢", "😡", "🤯", "👍"]
+
+class FakeSupabase(SQLiteClient):
+    """In-memory Supabase client.
+
+    `latency` adds a fixed sleep per round trip to approximate network cost.
+    """
+
+    def __init__(self, latency: float = 0.0):
+        super().__init__(":memory:")
+        self.latency = latency
+        self.round_trips = 0
+
+    def round_trip(self):
+        self.round_trips += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+def seed(client: SQLiteClient, posts: int, comments_per_post: float = 2.0, reactions_per_post: float = 3.0,
+         ai_reply_ratio: float = 0.8, seed_value: int = 42):
+    """Fill a SQLite-backed client with realistic-looking data spread over the last 30 days"""
+    rng = random.Random(seed_value)
+    start = datetime.now(timezone.utc) - timedelta(days=30)
+    step = timedelta(days=30) / max(1, posts)
+    words = "i feel like nobody notices when work friends coffee tired weekend again really".split()
+    new_id = lambda: str(uuid.UUID(int=rng.getrandbits(128), version=4))
+    users = [new_id() for _ in range(max(1, posts // 10))]
+
+    post_rows, comment_rows, reaction_rows = [], [], []
+    for i in range(posts):
+        created = (start + step * i).isoformat()
+        post_id = new_id()
+        content = " ".join(rng.choice(words) for _ in range(rng.randint(8, 40)))
+        post_rows.append((post_id, content, rng.choice(users), rng.choice(MOODS), created, created))
+        if rng.random() < ai_reply_ratio:
+            comment_rows.append((new_id(), post_id, "🤖 AI (wise): Every storm runs out of rain.", new_id(), 1, "wise", created, created))
+        for _ in range(int(rng.expovariate(1 / comments_per_post)) if comments_per_post else 0):
+            comment_rows.append((new_id(), post_id, "same here honestly", rng.choice(users), 0, None, created, created))
+        for _ in range(int(rng.expovariate(1 / reactions_per_post)) if reactions_per_post else 0):
+            reaction_rows.append((new_id(), post_id, rng.choice(EMOJIS), rng.choice(users), created))
+
+    with client.lock:
+        client.db.executemany("INSERT INTO posts (id, content, user_id, mood, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?)", post_rows)
+        client.db.executemany(
+            "INSERT INTO comments (id, post_id, content, user_id, is_ai, ai_mode, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            comment_rows
+        )
+        client.db.executemany("INSERT OR IGNORE INTO reactions (id, post_id, emoji, user_id, created_at) VALUES (?, ?, ?, ?, ?)", reaction_rows)
+        client.db.commit()
+        client.db.execute("ANALYZE")
+    return client
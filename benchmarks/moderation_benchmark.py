@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Benchmark moderation latency as the banned term list grows
+"""
+
+import os
+import sys
+import time
+import random
+import string
+
+# Add project root to path
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from moderation import Moderator
+
+TERM_COUNTS = [10, 1_000, 10_000, 100_000]
+RUNS = 200
+
+def random_word(rng, length):
+    return "".join(rng.choice(string.ascii_lowercase) for _ in range(length))
+
+def make_text(rng, words=300):
+    """A ~2000 character confession that matches nothing"""
+    return " ".join(random_word(rng, rng.randint(3, 8)) for _ in range(words))[:2000]
+
+def benchmark():
+    rng = random.Random(42)
+    texts = [make_text(rng) for _ in range(20)]
+
+    print("🛡️ Moderation benchmark (2000-char texts)")
+    print(f"{'terms':>10} {'build ms':>10} {'per text µs':>12}")
+
+    for count in TERM_COUNTS:
+        terms = [random_word(rng, rng.randint(4, 10)) for _ in range(count)]
+        # Include some multi-word phrases like a real list would
+        terms += [f"{random_word(rng, 5)} {random_word(rng, 5)}" for _ in range(count // 10)]
+
+        start = time.perf_counter()
+        moderator = Moderator(terms)
+        build_ms = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        for i in range(RUNS):
+            moderator.find(texts[i % len(texts)])
+        per_text_us = (time.perf_counter() - start) / RUNS * 1_000_000
+
+        print(f"{count:>10,} {build_ms:>10.1f} {per_text_us:>12.1f}")
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the OpenRouter chat completions endpoint.
+
+Answers every request after a configurable delay, failing a configurable
+share of them with a retryable status, and supports streamed (SSE) replies.
+Point the app at it with OPENROUTER_URL=http://127.0.0.1:<port>/api/v1/chat/completions.
+"""
+
+import json
+import time
+import random
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+REPLY = "Every storm runs out of rain, and this one will too. Café vibes 🥣"
+
+class StubOpenRouter:
+    """Threaded HTTP server faking OpenRouter, usable as a context manager"""
+
+    def __init__(self, latency: float = 0.2, jitter: float = 0.0, error_rate: float = 0.0,
+                 error_status: int = 503, host: str = "127.0.0.1", port: int = 0, seed: int = 42,
+                 reply: str = REPLY):
+        self.latency = latency
+        self.reply = reply
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.requests = 0
+        self.errors = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.server = ThreadingHTTPServer((host, port), self._handler())
+        self.server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/api/v1/chat/completions"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, name="stub-openrouter", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _next_outcome(self):
+        """Delay and whether to fail for the next request"""
+        with self._lock:
+            self.requests += 1
+            delay = max(0.0, self.latency + self._rng.uniform(-self.jitter, self.jitter))
+            fail = self._rng.random() < self.error_rate
+            self.errors += int(fail)
+        return delay, fail
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send_json(self, status, body):
+                data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                payload = json.loads(self.rfile.read(length) or b"{}")
+                delay, fail = stub._next_outcome()
+                time.sleep(delay)
+
+                if fail:
+                    self._send_json(stub.error_status, {"error": {"message": "stub failure", "code": stub.error_status}})
+                    return
+
+                if not payload.get("stream"):
+                    self._send_json(200, {"choices": [{"message": {"role": "assistant", "content": stub.reply}}]})
+                    return
+
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Connection", "close")
+                self.end_headers()
+                # Raw UTF-8 like the real API, no charset in the Content-Type
+                for word in stub.reply.split(" "):
+                    chunk = {"choices": [{"delta": {"content": word + " "}}]}
+                    self.wfile.write(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode("utf-8"))
+                self.wfile.write(b"data: [DONE]\n\n")
+                self.close_connection = True
+
+        return Handler
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a local OpenRouter stub")
+    parser.add_argument("--port", type=int, default=8787)
+    parser.add_argument("--latency", type=float, default=0.5, help="seconds per reply")
+    parser.add_argument("--jitter", type=float, default=0.1, help="random +/- seconds added to latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests that fail, 0-1")
+    parser.add_argument("--error-status", type=int, default=503)
+    args = parser.parse_args()
+
+    stub = StubOpenRouter(args.latency, args.jitter, args.error_rate, args.error_status, port=args.port)
+    print(f"🤖 Stub OpenRouter listening on {stub.url}")
+    try:
+        stub.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+import re
+import html
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+# Number of rendered post cards kept in memory
+CARD_CACHE_SIZE = 2000
+
+_card_cache = OrderedDict()
+_card_cache_lock = threading.Lock()
+
+# Fractional seconds of any length, which fromisoformat only accepts from Python 3.11
+_FRACTION_RE = re.compile(r"\.(\d+)")
+
+def _parse_timestamp(timestamp):
+    """Parse an ISO timestamp from the database as an aware UTC datetime, or None"""
+    if isinstance(timestamp, datetime):
+        dt = timestamp
+    else:
+        try:
+            text = _FRACTION_RE.sub(lambda m: "." + m.group(1)[:6].ljust(6, "0"), str(timestamp).replace("Z", "+00:00"), 1)
+            dt = datetime.fromisoformat(text)
+        except ValueError:
+            return None
+    return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+
+def format_times_ago(timestamps):
+    """Format many timestamps to 'X time ago' strings against a single `now`"""
+    now = datetime.now(timezone.utc)
+    labels = []
+    for timestamp in timestamps:
+        dt = _parse_timestamp(timestamp)
+        if dt is None:
+            labels.append("some time")
+            continue
+        diff = now - dt
+        if diff.days > 0:
+            labels.append(f"{diff.days} day{'s' if diff.days > 1 else ''}")
+        elif diff.seconds > 3600:
+            hours = diff.seconds // 3600
+            labels.append(f"{hours} hour{'s' if hours > 1 else ''}")
+        elif diff.seconds > 60:
+            minutes = diff.seconds // 60
+            labels.append(f"{minutes} minute{'s' if minutes > 1 else ''}")
+        else:
+            labels.append("just now")
+    return labels
+
+def post_card_html(post: dict, time_ago: str):
+    """Escaped HTML for a post card.
+
+    The card is cached by (post id, updated_at), so it is only rebuilt when
+    the post changes; the relative timestamp is filled in on every render.
+    """
+    key = (post["id"], post.get("updated_at") or post.get("created_at"))
+    with _card_cache_lock:
+        parts = _card_cache.get(key)
+        if parts is not None:
+            _card_cache.move_to_end(key)
+
+    if parts is None:
+        mood = html.escape(post["mood"])
+        parts = (
+            f'<div class="post-card">'
+            f'<span class="mood-tag mood-{mood}">{mood.upper()}</span>'
+            f'<p>{html.escape(post["content"])}</p>'
+            f'<div class="timestamp">Posted ',
+            '</div></div>'
+        )
+        with _card_cache_lock:
+            _card_cache[key] = parts
+            while len(_card_cache) > CARD_CACHE_SIZE:
+                _card_cache.popitem(last=False)
+
+    return parts[0] + html.escape(time_ago) + parts[1]
+
+def ai_reply_html(ai_data: dict):
+    """Escaped HTML for an AI reply under a post card"""
+    return (
+        f'<div class="ai-reply">'
+        f'AI ({html.escape(ai_data["mode"])}): {html.escape(ai_data["response"])}'
+        f'</div>'
+    )
+
+def ai_status_html(status: str):
+    """HTML for an AI reply that isn't ready yet"""
+    return f'<div class="timestamp">{html.escape(status)}</div>'
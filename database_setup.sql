@@ -17,10 +17,19 @@ CREATE TABLE IF NOT EXISTS comments (
     post_id uuid NOT NULL REFERENCES posts(id) ON DELETE CASCADE,
     content text NOT NULL,
     user_id uuid DEFAULT NULL,
+    is_ai boolean NOT NULL DEFAULT false,
+    ai_mode text DEFAULT NULL,
     created_at timestamp with time zone DEFAULT timezone('utc'::text, now()) NOT NULL,
     updated_at timestamp with time zone DEFAULT timezone('utc'::text, now()) NOT NULL
 );
 
+-- Flag AI replies on databases created before these columns existed
+ALTER TABLE comments ADD COLUMN IF NOT EXISTS is_ai boolean NOT NULL DEFAULT false;
+ALTER TABLE comments ADD COLUMN IF NOT EXISTS ai_mode text DEFAULT NULL;
+UPDATE comments
+SET is_ai = true, ai_mode = substring(content from 'AI \((\w+)\):')
+WHERE NOT is_ai AND content ~ '^(🤖 )?AI \(\w+\):';
+
 -- Create reactions table
 CREATE TABLE IF NOT EXISTS reactions (
     id uuid PRIMARY KEY DEFAULT gen_random_uuid(),
@@ -54,11 +63,41 @@ CREATE TABLE IF NOT EXISTS user_profiles (
     last_active timestamp with time zone DEFAULT timezone('utc'::text, now()) NOT NULL
 );
 
+-- Per-mood post counts for each profile, e.g. {"sad": 2, "lol": 5}
+ALTER TABLE user_profiles ADD COLUMN IF NOT EXISTS mood_counts jsonb NOT NULL DEFAULT '{}'::jsonb;
+
+-- Create ai_reply_jobs table (queue for background AI replies)
+CREATE TABLE IF NOT EXISTS ai_reply_jobs (
+    id uuid PRIMARY KEY DEFAULT gen_random_uuid(),
+    post_id uuid NOT NULL UNIQUE REFERENCES posts(id) ON DELETE CASCADE,
+    mode text NOT NULL DEFAULT 'wise',
+    status text NOT NULL DEFAULT 'pending' CHECK (status IN ('pending', 'running', 'done', 'failed')),
+    attempts integer NOT NULL DEFAULT 0,
+    last_error text DEFAULT NULL,
+    run_after timestamp with time zone DEFAULT timezone('utc'::text, now()) NOT NULL,
+    locked_until timestamp with time zone DEFAULT NULL,
+    created_at timestamp with time zone DEFAULT timezone('utc'::text, now()) NOT NULL,
+    updated_at timestamp with time zone DEFAULT timezone('utc'::text, now()) NOT NULL
+);
+
 -- Add indexes for better performance
 CREATE INDEX IF NOT EXISTS posts_created_at_idx ON posts(created_at DESC);
 CREATE INDEX IF NOT EXISTS posts_mood_idx ON posts(mood);
 CREATE INDEX IF NOT EXISTS comments_post_id_idx ON comments(post_id);
+CREATE INDEX IF NOT EXISTS comments_ai_post_id_idx ON comments(post_id, created_at) WHERE is_ai;
 CREATE INDEX IF NOT EXISTS reactions_post_id_idx ON reactions(post_id);
+CREATE INDEX IF NOT EXISTS ai_reply_jobs_ready_idx ON ai_reply_jobs(run_after) WHERE status IN ('pending', 'running');
+
+-- Keyset pagination indexes for the feed (newest first, optionally by mood)
+CREATE INDEX IF NOT EXISTS posts_created_at_id_idx ON posts(created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS posts_mood_created_at_id_idx ON posts(mood, created_at DESC, id DESC);
+
+-- Keyset pagination indexes for backup.py exports
+CREATE INDEX IF NOT EXISTS comments_created_at_id_idx ON comments(created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS reactions_created_at_id_idx ON reactions(created_at DESC, id DESC);
+
+-- Full-text search index over post content, used by search_posts()
+CREATE INDEX IF NOT EXISTS posts_content_search_idx ON posts USING GIN (to_tsvector('english', content));
 
 -- Enable Row Level Security (RLS)
 ALTER TABLE posts ENABLE ROW LEVEL SECURITY;
@@ -66,6 +105,7 @@ ALTER TABLE comments ENABLE ROW LEVEL SECURITY;
 ALTER TABLE reactions ENABLE ROW LEVEL SECURITY;
 ALTER TABLE rooms ENABLE ROW LEVEL SECURITY;
 ALTER TABLE user_profiles ENABLE ROW LEVEL SECURITY;
+ALTER TABLE ai_reply_jobs ENABLE ROW LEVEL SECURITY;
 
 -- Create policies for anonymous access
 -- Posts: Allow all operations for everyone (since it's anonymous)
@@ -84,6 +124,9 @@ CREATE POLICY "Allow insert access to rooms" ON rooms FOR INSERT WITH CHECK (tru
 -- User profiles: Allow all access
 CREATE POLICY "Allow all access to user_profiles" ON user_profiles FOR ALL USING (true);
 
+-- AI reply jobs: Allow all access (workers run with the same anon key)
+CREATE POLICY "Allow all access to ai_reply_jobs" ON ai_reply_jobs FOR ALL USING (true);
+
 -- Create functions for automatic timestamp updates
 CREATE OR REPLACE FUNCTION update_updated_at_column()
 RETURNS TRIGGER AS $$
@@ -100,6 +143,121 @@ CREATE TRIGGER update_posts_updated_at BEFORE UPDATE ON posts
 CREATE TRIGGER update_comments_updated_at BEFORE UPDATE ON comments
     FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
 
+CREATE TRIGGER update_ai_reply_jobs_updated_at BEFORE UPDATE ON ai_reply_jobs
+    FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
+
+-- Create function to adjust a user's profile counters
+CREATE OR REPLACE FUNCTION bump_user_profile(p_anonymous_id text, p_posts integer, p_comments integer, p_reactions integer, p_mood text DEFAULT NULL)
+RETURNS void AS $$
+BEGIN
+    -- Rows without a session ID (old rows, the shared 'anon' reactor) aren't tracked
+    IF p_anonymous_id IS NULL OR p_anonymous_id = 'anon' THEN
+        RETURN;
+    END IF;
+
+    INSERT INTO user_profiles (anonymous_id, total_posts, total_comments, total_reactions, mood_counts)
+    VALUES (
+        p_anonymous_id,
+        GREATEST(p_posts, 0),
+        GREATEST(p_comments, 0),
+        GREATEST(p_reactions, 0),
+        CASE WHEN p_mood IS NOT NULL AND p_posts > 0 THEN jsonb_build_object(p_mood, p_posts) ELSE '{}'::jsonb END
+    )
+    ON CONFLICT (anonymous_id) DO UPDATE SET
+        total_posts = GREATEST(user_profiles.total_posts + p_posts, 0),
+        total_comments = GREATEST(user_profiles.total_comments + p_comments, 0),
+        total_reactions = GREATEST(user_profiles.total_reactions + p_reactions, 0),
+        mood_counts = CASE
+            WHEN p_mood IS NULL THEN user_profiles.mood_counts
+            ELSE user_profiles.mood_counts || jsonb_build_object(
+                p_mood, GREATEST(COALESCE((user_profiles.mood_counts ->> p_mood)::integer, 0) + p_posts, 0)
+            )
+        END,
+        last_active = timezone('utc'::text, now());
+
+    -- Favorite mood is the most posted one (at most six moods to look at)
+    IF p_mood IS NOT NULL THEN
+        UPDATE user_profiles
+        SET favorite_mood = COALESCE((
+            SELECT key FROM jsonb_each_text(mood_counts)
+            WHERE value::integer > 0
+            ORDER BY value::integer DESC, key
+            LIMIT 1
+        ), 'meh')
+        WHERE anonymous_id = p_anonymous_id;
+    END IF;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Create trigger functions keeping user_profiles in step with posts, comments and reactions
+CREATE OR REPLACE FUNCTION track_post_profile_counts()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        PERFORM bump_user_profile(NEW.user_id::text, 1, 0, 0, NEW.mood);
+        RETURN NEW;
+    END IF;
+    PERFORM bump_user_profile(OLD.user_id::text, -1, 0, 0, OLD.mood);
+    RETURN OLD;
+END;
+$$ language 'plpgsql';
+
+CREATE OR REPLACE FUNCTION track_comment_profile_counts()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        IF NOT NEW.is_ai THEN
+            PERFORM bump_user_profile(NEW.user_id::text, 0, 1, 0);
+        END IF;
+        RETURN NEW;
+    END IF;
+    IF NOT OLD.is_ai THEN
+        PERFORM bump_user_profile(OLD.user_id::text, 0, -1, 0);
+    END IF;
+    RETURN OLD;
+END;
+$$ language 'plpgsql';
+
+CREATE OR REPLACE FUNCTION track_reaction_profile_counts()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        PERFORM bump_user_profile(NEW.user_id, 0, 0, 1);
+        RETURN NEW;
+    END IF;
+    PERFORM bump_user_profile(OLD.user_id, 0, 0, -1);
+    RETURN OLD;
+END;
+$$ language 'plpgsql';
+
+CREATE TRIGGER posts_profile_counts AFTER INSERT OR DELETE ON posts
+    FOR EACH ROW EXECUTE FUNCTION track_post_profile_counts();
+
+CREATE TRIGGER comments_profile_counts AFTER INSERT OR DELETE ON comments
+    FOR EACH ROW EXECUTE FUNCTION track_comment_profile_counts();
+
+CREATE TRIGGER reactions_profile_counts AFTER INSERT OR DELETE ON reactions
+    FOR EACH ROW EXECUTE FUNCTION track_reaction_profile_counts();
+
+-- Create function for workers to claim due AI reply jobs.
+-- Running jobs whose lease expired (crashed worker) are claimed again.
+CREATE OR REPLACE FUNCTION claim_ai_reply_jobs(batch_size integer DEFAULT 1, lease_seconds integer DEFAULT 120)
+RETURNS SETOF ai_reply_jobs AS $$
+    UPDATE ai_reply_jobs j
+    SET status = 'running',
+        attempts = j.attempts + 1,
+        locked_until = timezone('utc'::text, now()) + make_interval(secs => lease_seconds)
+    WHERE j.id IN (
+        SELECT id FROM ai_reply_jobs
+        WHERE (status = 'pending' AND run_after <= timezone('utc'::text, now()))
+           OR (status = 'running' AND locked_until < timezone('utc'::text, now()))
+        ORDER BY run_after
+        LIMIT batch_size
+        FOR UPDATE SKIP LOCKED
+    )
+    RETURNING j.*;
+$$ LANGUAGE sql;
+
 -- Create function to get post stats
 CREATE OR REPLACE FUNCTION get_post_stats(post_uuid uuid)
 RETURNS json AS $$
@@ -116,6 +274,76 @@ BEGIN
 END;
 $$ LANGUAGE plpgsql;
 
+-- Create function to count reactions per emoji for a page of posts
+CREATE OR REPLACE FUNCTION reaction_counts(post_ids uuid[])
+RETURNS TABLE(post_id uuid, emoji text, count bigint) AS $$
+    SELECT r.post_id, r.emoji, COUNT(*)
+    FROM reactions r
+    WHERE r.post_id = ANY(post_ids)
+    GROUP BY r.post_id, r.emoji;
+$$ LANGUAGE sql STABLE;
+
+-- Create function to get app-wide stats in one round trip
+CREATE OR REPLACE FUNCTION get_app_stats()
+RETURNS json AS $$
+    SELECT json_build_object(
+        'posts', (SELECT COUNT(*) FROM posts),
+        'comments', (SELECT COUNT(*) FROM comments),
+        'reactions', (SELECT COUNT(*) FROM reactions),
+        'moods', COALESCE((
+            SELECT json_object_agg(mood, mood_count)
+            FROM (SELECT mood, COUNT(*) AS mood_count FROM posts GROUP BY mood) m
+        ), '{}'::json)
+    );
+$$ LANGUAGE sql STABLE;
+
+-- Create function for full-text search, best matches first. Pass the last
+-- row's rank, created_at and id as after_* to get the next page.
+CREATE OR REPLACE FUNCTION search_posts(search_query text, mood_filter text DEFAULT NULL, result_limit integer DEFAULT 20,
+                                        after_rank real DEFAULT NULL, after_created_at timestamptz DEFAULT NULL, after_id uuid DEFAULT NULL)
+RETURNS TABLE(id uuid, content text, user_id uuid, mood text, created_at timestamptz, updated_at timestamptz,
+              comment_count bigint, reaction_count bigint, reactions json, rank real) AS $$
+    SELECT
+        p.id, p.content, p.user_id, p.mood, p.created_at, p.updated_at,
+        (SELECT COUNT(*) FROM comments c WHERE c.post_id = p.id),
+        (SELECT COUNT(*) FROM reactions r WHERE r.post_id = p.id),
+        COALESCE((SELECT json_agg(r.emoji) FROM reactions r WHERE r.post_id = p.id), '[]'::json),
+        m.rank
+    FROM posts p
+    CROSS JOIN LATERAL (
+        SELECT ts_rank(to_tsvector('english', p.content), websearch_to_tsquery('english', search_query)) AS rank
+    ) m
+    WHERE to_tsvector('english', p.content) @@ websearch_to_tsquery('english', search_query)
+      AND (mood_filter IS NULL OR p.mood = mood_filter)
+      AND (after_rank IS NULL OR (m.rank, p.created_at, p.id) < (after_rank, after_created_at, after_id))
+    ORDER BY m.rank DESC, p.created_at DESC, p.id DESC
+    LIMIT result_limit;
+$$ LANGUAGE sql STABLE;
+
+-- Create procedure to purge posts older than retention_days, batch_size at a
+-- time, committing after each batch so locks and WAL stay small. Comments,
+-- reactions and AI reply jobs cascade. Schedule it with pg_cron, e.g.
+--   SELECT cron.schedule('purge-old-posts', '0 3 * * *', 'CALL purge_old_posts(90)');
+CREATE OR REPLACE PROCEDURE purge_old_posts(retention_days integer, batch_size integer DEFAULT 1000)
+AS $$
+DECLARE
+    deleted integer;
+BEGIN
+    LOOP
+        DELETE FROM posts
+        WHERE id IN (
+            SELECT id FROM posts
+            WHERE created_at < NOW() - make_interval(days => retention_days)
+            ORDER BY created_at
+            LIMIT batch_size
+        );
+        GET DIAGNOSTICS deleted = ROW_COUNT;
+        COMMIT;
+        EXIT WHEN deleted < batch_size;
+    END LOOP;
+END;
+$$ LANGUAGE plpgsql;
+
 -- Insert some sample data (optional)
 INSERT INTO posts (content, mood) VALUES 
     ('I eat cereal for dinner more often than actual meals and I''m not even sorry about it 🥣', 'meh'),
@@ -125,20 +353,22 @@ INSERT INTO posts (content, mood) VALUES
     ('I spent 3 hours organizing my digital photos today and it felt more productive than my actual job', 'lol');
 
 -- Add some AI comments to the sample posts
-INSERT INTO comments (post_id, content, user_id) 
+INSERT INTO comments (post_id, content, is_ai, ai_mode) 
 SELECT 
     p.id,
     '🤖 AI (funny): Cereal for dinner is just breakfast for rebels. You''re living in 3023 while the rest of us are stuck in boring dinner traditions!',
-    'ai_bot'
+    true,
+    'funny'
 FROM posts p 
 WHERE p.content LIKE '%cereal%' 
 LIMIT 1;
 
-INSERT INTO comments (post_id, content, user_id) 
+INSERT INTO comments (post_id, content, is_ai, ai_mode) 
 SELECT 
     p.id,
     '🤖 AI (helpful): Meeting confusion is universal! Try the "strategic nodding and note-taking" technique - works 73% of the time, every time.',
-    'ai_bot'
+    true,
+    'helpful'
 FROM posts p 
 WHERE p.content LIKE '%meetings%' 
 LIMIT 1;
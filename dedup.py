@@ -0,0 +1,208 @@
+import os
+import re
+import time
+import logging
+import sqlite3
+import hashlib
+import threading
+from dotenv import load_dotenv
+from metrics import timed
+from reply_cache import AI_REPLY_CACHE_PATH, normalize_text, text_hash, get_reply_cache
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Near-duplicate settings, all overridable through the environment
+DEDUP_ENABLED = os.getenv("DEDUP_ENABLED", "1") != "0"
+DEDUP_MAX_DISTANCE = int(os.getenv("DEDUP_MAX_DISTANCE", "4"))
+DEDUP_MIN_WORDS = int(os.getenv("DEDUP_MIN_WORDS", "6"))
+DEDUP_MAX_ENTRIES = int(os.getenv("DEDUP_MAX_ENTRIES", "50000"))
+# Fingerprint matches are confirmed on the words themselves: at least this
+# much word-set overlap, and only added or dropped words, never swapped ones.
+# A few bits of SimHash distance can't tell "hate" from "love"
+DEDUP_MIN_JACCARD = float(os.getenv("DEDUP_MIN_JACCARD", "0.9"))
+
+# SimHash fingerprints are split into this many bands for lookup. Two
+# fingerprints within BANDS - 1 bits of each other agree on at least one
+# whole band, so every match up to distance 4 is found.
+SIMHASH_BITS = 64
+SIMHASH_BANDS = 5
+_BAND_WIDTHS = [SIMHASH_BITS // SIMHASH_BANDS + (i < SIMHASH_BITS % SIMHASH_BANDS) for i in range(SIMHASH_BANDS)]
+
+_WORD_RE = re.compile(r"\w+")
+_APOSTROPHE_RE = re.compile(r"['’]")
+
+def words(text: str):
+    """Words of the normalized text, ignoring punctuation"""
+    return _WORD_RE.findall(_APOSTROPHE_RE.sub("", normalize_text(text)))
+
+def shingles(text: str):
+    """Words and word pairs of the normalized text, ignoring punctuation"""
+    tokens = words(text)
+    return tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+
+def simhash(text: str):
+    """64-bit SimHash of a text; similar texts differ in few bits"""
+    weights = [0] * SIMHASH_BITS
+    for shingle in shingles(text):
+        value = int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "big")
+        for bit in range(SIMHASH_BITS):
+            weights[bit] += 1 if value >> bit & 1 else -1
+    return sum(1 << bit for bit, weight in enumerate(weights) if weight > 0)
+
+def hamming_distance(a: int, b: int):
+    """Number of differing bits between two fingerprints"""
+    return bin(a ^ b).count("1")
+
+def same_words(a: set, b: set, min_jaccard: float = DEDUP_MIN_JACCARD):
+    """Whether two word sets differ only by a few added or dropped words"""
+    if not a or not b or not (a <= b or b <= a):
+        return False
+    return len(a & b) / len(a | b) >= min_jaccard
+
+def _bands(fingerprint: int):
+    bands, shift = [], 0
+    for width in _BAND_WIDTHS:
+        bands.append(fingerprint >> shift & ((1 << width) - 1))
+        shift += width
+    return bands
+
+def _to_signed(fingerprint: int):
+    """SQLite integers are signed 64-bit"""
+    return fingerprint - (1 << 64) if fingerprint >= 1 << 63 else fingerprint
+
+class NearDuplicateIndex:
+    """SimHash index of post texts, kept in the AI reply cache database.
+
+    Rows are keyed by the same text hash as the reply cache, so a match
+    points straight at any reply cached for the earlier post. Texts shorter
+    than min_words are not indexed; their fingerprints are too noisy. Each
+    row also keeps the text's distinct words, so fingerprint matches can be
+    confirmed with same_words before a reply is reused.
+    """
+
+    def __init__(self, path: str = AI_REPLY_CACHE_PATH, max_distance: int = DEDUP_MAX_DISTANCE,
+                 min_words: int = DEDUP_MIN_WORDS, max_entries: int = DEDUP_MAX_ENTRIES,
+                 min_jaccard: float = DEDUP_MIN_JACCARD):
+        self.path = path
+        self.max_distance = max_distance
+        self.min_jaccard = min_jaccard
+        self.min_words = min_words
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        band_columns = ", ".join(f"band{i} INTEGER NOT NULL" for i in range(SIMHASH_BANDS))
+        self._conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS post_simhashes (
+                text_hash TEXT PRIMARY KEY,
+                simhash INTEGER NOT NULL,
+                {band_columns},
+                created_at REAL NOT NULL,
+                words TEXT NOT NULL DEFAULT ''
+            )
+        """)
+        # Indexes created before words were stored; their rows never confirm
+        # and age out through eviction
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(post_simhashes)")]
+        if "words" not in columns:
+            self._conn.execute("ALTER TABLE post_simhashes ADD COLUMN words TEXT NOT NULL DEFAULT ''")
+        for i in range(SIMHASH_BANDS):
+            self._conn.execute(f"CREATE INDEX IF NOT EXISTS post_simhashes_band{i}_idx ON post_simhashes(band{i})")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS post_simhashes_created_at_idx ON post_simhashes(created_at)")
+        self._conn.commit()
+
+    def _fingerprint(self, text: str):
+        """SimHash of a text, or None if it is too short to compare"""
+        if len(words(text)) < self.min_words:
+            return None
+        return simhash(text)
+
+    def add(self, text: str):
+        """Index a post text; returns whether it was indexed"""
+        fingerprint = self._fingerprint(text)
+        if fingerprint is None:
+            return False
+        try:
+            with self._lock:
+                self._conn.execute(
+                    f"INSERT OR IGNORE INTO post_simhashes VALUES (?, ?, {', '.join('?' * SIMHASH_BANDS)}, ?, ?)",
+                    [text_hash(text), _to_signed(fingerprint)] + _bands(fingerprint)
+                    + [time.time(), " ".join(sorted(set(words(text))))]
+                )
+                self._conn.execute(
+                    "DELETE FROM post_simhashes WHERE rowid IN "
+                    "(SELECT rowid FROM post_simhashes ORDER BY created_at DESC, rowid DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,)
+                )
+                self._conn.commit()
+            return True
+        except sqlite3.Error:
+            # Dedup is an optimization; never let it fail a post
+            logger.exception("Error indexing post text")
+            return False
+
+    @timed("dedup.find_similar")
+    def find_similar(self, text: str, limit: int = 5):
+        """Text hashes of indexed near-duplicates, closest first, as (text_hash, distance)"""
+        fingerprint = self._fingerprint(text)
+        if fingerprint is None:
+            return []
+        key = text_hash(text)
+        text_words = set(words(text))
+        bands = _bands(fingerprint)
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT text_hash, simhash, words FROM post_simhashes WHERE "
+                + " OR ".join(f"band{i} = ?" for i in range(SIMHASH_BANDS)),
+                bands
+            ).fetchall()
+        matches = []
+        for candidate_key, candidate, candidate_words in rows:
+            if candidate_key == key:
+                continue
+            distance = hamming_distance(fingerprint, candidate & ((1 << 64) - 1))
+            if distance <= self.max_distance and same_words(text_words, set(candidate_words.split()), self.min_jaccard):
+                matches.append((distance, candidate_key))
+        return [(candidate_key, distance) for distance, candidate_key in sorted(matches)][:limit]
+
+    def clear(self):
+        """Forget every indexed text"""
+        with self._lock:
+            self._conn.execute("DELETE FROM post_simhashes")
+            self._conn.commit()
+
+_index = None
+_index_lock = threading.Lock()
+
+def get_dedup_index():
+    """Get the shared near-duplicate index for this process"""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = NearDuplicateIndex()
+    return _index
+
+def index_post_text(text: str):
+    """Add a new post to the near-duplicate index, if enabled"""
+    if DEDUP_ENABLED:
+        get_dedup_index().add(text)
+
+def find_similar_reply(text: str, mode: str, model: str):
+    """Cached reply to a near-duplicate of `text` in the same mode, or None"""
+    if not DEDUP_ENABLED:
+        return None
+    cache = get_reply_cache()
+    for key, _ in get_dedup_index().find_similar(text):
+        # Probing candidates isn't a cache lookup of its own; keep it out of the hit rate
+        reply = cache.get_by_hash(key, mode, model, record=False)
+        if reply:
+            return reply
+    return None
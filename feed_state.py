@@ -0,0 +1,120 @@
+import streamlit as st
+from supabase import Client
+from supabase_config import get_posts_page, get_posts_since, search_posts
+
+def _fetch_page(supabase: Client, query: tuple, limit: int, before: tuple = None):
+    """One page of a feed: search results when it has a search term, posts otherwise"""
+    sort, mood, search = query
+    if search:
+        return search_posts(supabase, search, mood=mood, limit=limit, cursor=before)
+    return get_posts_page(supabase, limit=limit, sort=sort, mood=mood, before=before)
+
+def load_feed(supabase: Client, key: str, page_size: int, sort: str = "latest", mood: str = None, search: str = None):
+    """Get the posts loaded so far for a feed, fetching the first page when needed.
+
+    Loaded pages live in st.session_state[key] so reruns don't refetch them.
+    Changing the sort, mood or search term starts the feed over. Search
+    results come best match first and ignore `sort`.
+    """
+    query = (sort, mood, search or None)
+    feed = st.session_state.get(key)
+    if feed is None or feed["query"] != query:
+        posts, cursor = _fetch_page(supabase, query, page_size)
+        feed = st.session_state[key] = {
+            "query": query,
+            "page_size": page_size,
+            "posts": posts,
+            "cursor": cursor,
+            "page": 0,
+            "newest": posts[0]["created_at"] if posts and sort == "latest" and not search else None
+        }
+    return feed["posts"]
+
+def refresh_feed(supabase: Client, key: str, max_new: int = 100):
+    """Pull in posts newer than the newest one loaded, without refetching the rest.
+
+    Only the latest-first feed can be patched this way; ranked feeds, search
+    results (and feeds that fell too far behind) start over on the next
+    load_feed().
+    """
+    feed = st.session_state.get(key)
+    if not feed:
+        return
+    sort, mood, search = feed["query"]
+    if sort != "latest" or search:
+        reset_feed(key)
+        return
+
+    since = feed["newest"] or "1970-01-01T00:00:00+00:00"
+    new_posts = get_posts_since(supabase, since, mood=mood, limit=max_new)
+    if len(new_posts) >= max_new:
+        reset_feed(key)
+        return
+
+    # `since` is inclusive, so skip anything already on screen
+    loaded_ids = {post["id"] for post in feed["posts"]}
+    new_posts = [post for post in new_posts if post["id"] not in loaded_ids]
+    if new_posts:
+        feed["posts"][:0] = new_posts
+        feed["newest"] = feed["posts"][0]["created_at"]
+
+def load_more(supabase: Client, key: str):
+    """Append the next page of posts to a feed"""
+    feed = st.session_state.get(key)
+    if not feed or not feed["cursor"]:
+        return
+
+    posts, cursor = _fetch_page(supabase, feed["query"], feed["page_size"], before=feed["cursor"])
+    feed["posts"].extend(posts)
+    feed["cursor"] = cursor
+
+def has_more(key: str):
+    """Whether the feed has another page to load"""
+    feed = st.session_state.get(key)
+    return bool(feed and feed["cursor"])
+
+def reset_feed(key: str):
+    """Forget loaded pages so the next load_feed() starts from the top"""
+    st.session_state.pop(key, None)
+
+def get_page(key: str):
+    """Posts in the visible window of a feed; only these get rendered"""
+    feed = st.session_state.get(key)
+    if not feed:
+        return []
+    start = feed["page"] * feed["page_size"]
+    return feed["posts"][start:start + feed["page_size"]]
+
+def next_page(supabase: Client, key: str):
+    """Move the window forward a page, loading it from the database if needed"""
+    feed = st.session_state.get(key)
+    if not feed:
+        return
+    end_of_next = (feed["page"] + 2) * feed["page_size"]
+    if len(feed["posts"]) < end_of_next and feed["cursor"]:
+        load_more(supabase, key)
+    if len(feed["posts"]) > (feed["page"] + 1) * feed["page_size"]:
+        feed["page"] += 1
+
+def prev_page(key: str):
+    """Move the window back a page"""
+    feed = st.session_state.get(key)
+    if feed:
+        feed["page"] = max(0, feed["page"] - 1)
+
+def render_page_controls(supabase: Client, key: str):
+    """Previous/next buttons for a feed's window"""
+    feed = st.session_state.get(key)
+    if not feed:
+        return
+    has_next = len(feed["posts"]) > (feed["page"] + 1) * feed["page_size"] or has_more(key)
+
+    col1, col2, col3 = st.columns([1, 1, 1])
+    with col1:
+        if feed["page"] > 0:
+            st.button("⬅️ Newer", key=f"{key}_prev", on_click=prev_page, args=(key,), use_container_width=True)
+    with col2:
+        st.caption(f"Page {feed['page'] + 1}")
+    with col3:
+        if has_next:
+            st.button("Older ➡️", key=f"{key}_next", on_click=next_page, args=(supabase, key), use_container_width=True)
@@ -0,0 +1,219 @@
+import os
+import json
+import time
+import bisect
+import functools
+import threading
+from contextlib import contextmanager
+import streamlit as st
+from dotenv import load_dotenv
+
+load_dotenv()
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") != "0"
+DEBUG_METRICS = os.getenv("DEBUG_METRICS", "0") == "1"
+
+# Latency histogram bucket upper bounds, in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+class _CallStats:
+    """Counters for one instrumented call site"""
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.latency_sum = 0.0
+        self.latency_max = 0.0
+        self.bucket_counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.payload_bytes = 0
+
+    def observe(self, seconds: float, payload_bytes: int, error: bool):
+        self.calls += 1
+        self.errors += int(error)
+        self.latency_sum += seconds
+        self.latency_max = max(self.latency_max, seconds)
+        self.bucket_counts[bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        self.payload_bytes += payload_bytes
+
+    def quantile(self, q: float):
+        """Estimate a latency quantile as the upper bound of its histogram bucket"""
+        if not self.calls:
+            return 0.0
+        target = q * self.calls
+        seen = 0
+        for bound, count in zip(LATENCY_BUCKETS, self.bucket_counts):
+            seen += count
+            if seen >= target:
+                return bound
+        return self.latency_max
+
+_stats = {}
+_stats_lock = threading.Lock()
+_local = threading.local()
+
+def observe(name: str, seconds: float, payload_bytes: int = 0, error: bool = False):
+    """Record one call"""
+    if not METRICS_ENABLED:
+        return
+    with _stats_lock:
+        stats = _stats.get(name)
+        if stats is None:
+            stats = _stats[name] = _CallStats()
+        stats.observe(seconds, payload_bytes, error)
+
+def mark_error():
+    """Flag the instrumented call running on this thread as failed.
+
+    For functions that catch their own exceptions and return a fallback.
+    """
+    calls = getattr(_local, "calls", None)
+    if calls:
+        calls[-1]["error"] = True
+
+def payload_size(result):
+    """Approximate payload size of a result in bytes"""
+    if result is None:
+        return 0
+    if isinstance(result, (str, bytes)):
+        return len(result)
+    try:
+        return len(json.dumps(result, default=str))
+    except (TypeError, ValueError):
+        return 0
+
+def timed(name: str, is_error=None):
+    """Decorator recording call count, latency, payload size and errors.
+
+    `is_error` optionally inspects the return value for failures reported
+    as a value rather than an exception.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not METRICS_ENABLED:
+                return func(*args, **kwargs)
+
+            calls = getattr(_local, "calls", None)
+            if calls is None:
+                calls = _local.calls = []
+            call = {"error": False}
+            calls.append(call)
+            start = time.perf_counter()
+            try:
+                result = func(*args, **kwargs)
+            except Exception:
+                observe(name, time.perf_counter() - start, error=True)
+                raise
+            finally:
+                calls.pop()
+            elapsed = time.perf_counter() - start
+            error = call["error"] or bool(is_error and is_error(result))
+            observe(name, elapsed, payload_size(result), error)
+            return result
+        return wrapper
+    return decorator
+
+@contextmanager
+def timer(name: str):
+    """Time a block of code, e.g. rendering"""
+    start = time.perf_counter()
+    error = False
+    try:
+        yield
+    except Exception:
+        error = True
+        raise
+    finally:
+        observe(name, time.perf_counter() - start, error=error)
+
+def snapshot():
+    """All metrics as a plain dict"""
+    with _stats_lock:
+        return {
+            name: {
+                "calls": stats.calls,
+                "errors": stats.errors,
+                "latency_avg": stats.latency_sum / stats.calls if stats.calls else 0.0,
+                "latency_p50": stats.quantile(0.5),
+                "latency_p95": stats.quantile(0.95),
+                "latency_max": stats.latency_max,
+                "latency_sum": stats.latency_sum,
+                "latency_buckets": dict(zip([str(b) for b in LATENCY_BUCKETS] + ["+Inf"], stats.bucket_counts)),
+                "payload_bytes": stats.payload_bytes
+            }
+            for name, stats in sorted(_stats.items())
+        }
+
+def reset():
+    """Forget everything recorded so far"""
+    with _stats_lock:
+        _stats.clear()
+
+def to_json():
+    """Metrics as a JSON document"""
+    return json.dumps(snapshot(), indent=2)
+
+def to_prometheus():
+    """Metrics in the Prometheus text exposition format"""
+    lines = [
+        "# HELP unfiltered_call_duration_seconds Latency of instrumented calls.",
+        "# TYPE unfiltered_call_duration_seconds histogram"
+    ]
+    data = snapshot()
+    for name, stats in data.items():
+        cumulative = 0
+        for bound, count in stats["latency_buckets"].items():
+            cumulative += count
+            lines.append(f'unfiltered_call_duration_seconds_bucket{{call="{name}",le="{bound}"}} {cumulative}')
+        lines.append(f'unfiltered_call_duration_seconds_sum{{call="{name}"}} {stats["latency_sum"]}')
+        lines.append(f'unfiltered_call_duration_seconds_count{{call="{name}"}} {stats["calls"]}')
+
+    for metric, key, help_text in [
+        ("unfiltered_call_errors_total", "errors", "Failed instrumented calls."),
+        ("unfiltered_call_payload_bytes_total", "payload_bytes", "Bytes returned by instrumented calls.")
+    ]:
+        lines.append(f"# HELP {metric} {help_text}")
+        lines.append(f"# TYPE {metric} counter")
+        for name, stats in data.items():
+            lines.append(f'{metric}{{call="{name}"}} {stats[key]}')
+    return "\n".join(lines) + "\n"
+
+def export(path: str):
+    """Write metrics to a file, Prometheus text for .prom/.txt, JSON otherwise"""
+    content = to_prometheus() if path.endswith((".prom", ".txt")) else to_json()
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(content)
+
+def render_debug_panel():
+    """Sidebar panel with per-call timings, shown with DEBUG_METRICS=1 or ?debug=1"""
+    if not (DEBUG_METRICS or st.query_params.get("debug") == "1"):
+        return
+
+    with st.sidebar.expander("⏱️ Performance (debug)"):
+        data = snapshot()
+        if not data:
+            st.caption("No calls recorded yet")
+            return
+        st.dataframe(
+            [
+                {
+                    "call": name,
+                    "calls": stats["calls"],
+                    "errors": stats["errors"],
+                    "avg ms": round(stats["latency_avg"] * 1000, 1),
+                    "p95 ms": round(stats["latency_p95"] * 1000, 1),
+                    "max ms": round(stats["latency_max"] * 1000, 1),
+                    "KB": round(stats["payload_bytes"] / 1024, 1)
+                }
+                for name, stats in data.items()
+            ],
+            use_container_width=True,
+            hide_index=True
+        )
+        col1, col2 = st.columns(2)
+        with col1:
+            st.download_button("JSON", to_json(), "metrics.json", "application/json")
+        with col2:
+            st.download_button("Prometheus", to_prometheus(), "metrics.prom", "text/plain")
+        if st.button("Reset metrics"):
+            reset()
@@ -0,0 +1,88 @@
+import os
+import re
+import threading
+from dotenv import load_dotenv
+
+load_dotenv()
+
+MODERATION_TERMS_FILE = os.getenv(
+    "MODERATION_TERMS_FILE",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "moderation_terms.txt")
+)
+
+# Words are runs of letters, digits and underscores; apostrophes and quotes
+# split words, so "'hate'", "hate's" and "kill'em" still match
+_WORD_RE = re.compile(r"\w+")
+
+def _normalize_term(term: str):
+    """Lowercase a term and split it into words"""
+    return tuple(_WORD_RE.findall(term.lower()))
+
+class Moderator:
+    """Whole-word banned term matcher.
+
+    Text is tokenized once with a precompiled regex and each word (or run of
+    words, for multi-word phrases) is looked up in a hash set, so the cost
+    grows with the text length, not the size of the term list.
+    """
+
+    def __init__(self, terms):
+        self.terms = {}
+        for term in terms:
+            words = _normalize_term(term)
+            if words:
+                self.terms[words] = " ".join(words)
+        self.max_words = max((len(words) for words in self.terms), default=0)
+
+    @classmethod
+    def from_file(cls, path: str):
+        """Load terms from a file, one per line, skipping blanks and # comments"""
+        with open(path, encoding="utf-8") as f:
+            return cls(line.strip() for line in f if line.strip() and not line.lstrip().startswith("#"))
+
+    def find(self, text: str):
+        """Find banned terms in text as [{"term", "start", "end"}], in order of appearance"""
+        if not self.terms:
+            return []
+
+        tokens = [(m.group().lower(), m.start(), m.end()) for m in _WORD_RE.finditer(text)]
+        matches = []
+        for i in range(len(tokens)):
+            for n in range(1, min(self.max_words, len(tokens) - i) + 1):
+                words = tuple(token[0] for token in tokens[i:i + n])
+                term = self.terms.get(words)
+                if term:
+                    matches.append({"term": term, "start": tokens[i][1], "end": tokens[i + n - 1][2]})
+        return matches
+
+_moderator = None
+_moderator_lock = threading.Lock()
+
+def get_moderator():
+    """Get the shared moderator, loading the term list on first use"""
+    global _moderator
+    if _moderator is None:
+        with _moderator_lock:
+            if _moderator is None:
+                _moderator = Moderator.from_file(MODERATION_TERMS_FILE)
+    return _moderator
+
+def moderate_many(texts):
+    """Moderate many texts at once.
+
+    Returns one (is_appropriate, message, matches) tuple per text, where
+    matches lists the banned terms found and their character positions.
+    """
+    moderator = get_moderator()
+    results = []
+    for text in texts:
+        matches = moderator.find(text)
+        if matches:
+            results.append((False, f"Content contains inappropriate language: '{matches[0]['term']}'", matches))
+        elif len(text) > 2000:
+            results.append((False, "Content is too long (max 2000 characters)", matches))
+        elif len(text.strip()) < 3:
+            results.append((False, "Content is too short", matches))
+        else:
+            results.append((True, "Content approved", matches))
+    return results
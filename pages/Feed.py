@@ -1,9 +1,14 @@
 import streamlit as st
-from supabase_config import init_supabase, get_posts, get_comments, add_reaction
+from supabase_config import init_supabase, get_anon_id, get_comments_for_posts, count_reactions_for_posts, get_reaction_buffer, parse_ai_comment
+from feed_state import load_feed, get_page, render_page_controls, refresh_feed
 from ai_utils import get_ai_reply
+import metrics
 
 st.set_page_config(page_title="Feed - Unfiltered Club", page_icon="🌊")
 
+FEED_KEY = "feed_page_posts"
+FEED_PAGE_SIZE = 25
+
 def main():
     st.title("🌊 The Feed of Feels")
     
@@ -13,6 +18,9 @@ def main():
         st.error("Failed to connect to database.")
         return
 
+    # Full-text search, ranked by the database
+    search = st.text_input("🔎 Search confessions", placeholder="e.g. work, tired, weekend").strip()
+
     # Filter options
     col1, col2, col3 = st.columns(3)
     
@@ -30,19 +38,40 @@ def main():
     
     with col3:
         if st.button("🔄 Refresh"):
+            # Only fetch what was posted since the last load
+            refresh_feed(supabase, FEED_KEY)
             st.rerun()
 
-    # Get posts
-    posts = get_posts(supabase, limit=100)
-    
-    # Apply filters
-    if mood_filter != "All":
-        posts = [p for p in posts if p['mood'] == mood_filter]
+    # Get posts, already filtered and ranked by the database
+    sort_modes = {
+        "Latest": "latest",
+        "Most Commented": "most_commented",
+        "Most Reacted": "most_reacted"
+    }
+    loaded = load_feed(
+        supabase,
+        FEED_KEY,
+        FEED_PAGE_SIZE,
+        sort=sort_modes[sort_by],
+        mood=None if mood_filter == "All" else mood_filter,
+        search=search
+    )
     
-    if not posts:
+    if not loaded:
         st.info("No confessions match your filters. Try adjusting them!")
         return
 
+    if search:
+        st.caption(f"Best matches for “{search}” first")
+
+    # Only the visible page gets rendered
+    posts = get_page(FEED_KEY)
+
+    # Load comments and reaction counts for every post on the page in one go
+    post_ids = [post['id'] for post in posts]
+    comments_by_post = get_comments_for_posts(supabase, post_ids)
+    reactions_by_post = count_reactions_for_posts(supabase, post_ids)
+
     # Display posts
     for post in posts:
         with st.container():
@@ -57,26 +86,38 @@ def main():
             st.caption(f"Posted {post['created_at'][:10]} • Anonymous")
             
             # Comments
-            comments = get_comments(supabase, post['id'])
+            comments = comments_by_post.get(post['id'], [])
             if comments:
                 with st.expander(f"💬 {len(comments)} comments"):
                     for comment in comments:
-                        if comment['user_id'] == 'ai_bot':
-                            st.markdown(f"🤖 {comment['content']}")
+                        if comment.get('is_ai'):
+                            # Stored content already carries the "🤖 AI (mode):" label
+                            ai_data = parse_ai_comment(comment)
+                            st.markdown(f"🤖 AI ({ai_data['mode']}): {ai_data['response']}")
                         else:
                             st.markdown(f"👤 {comment['content']}")
             
-            # Quick reactions
-            col1, col2, col3, col4 = st.columns(4)
-            reactions = ["❤️", "😭", "😂", "🔥"]
-            
-            for i, (col, emoji) in enumerate(zip([col1, col2, col3, col4], reactions)):
-                with col:
-                    if st.button(emoji, key=f"feed_react_{post['id']}_{i}"):
-                        add_reaction(supabase, post['id'], emoji)
-                        st.success(f"Reacted with {emoji}")
+            # Quick reactions, a click reruns only this card's buttons
+            render_reactions(supabase, post, reactions_by_post.get(post['id'], []))
             
             st.divider()
 
+    render_page_controls(supabase, FEED_KEY)
+
+@st.fragment
+def render_reactions(supabase, post, reaction_counts):
+    """Reaction buttons for one post"""
+    reactions = ["❤️", "😭", "😂", "🔥"]
+    counts = {r['emoji']: r['count'] for r in reaction_counts}
+    
+    for i, (col, emoji) in enumerate(zip(st.columns(4), reactions)):
+        with col:
+            count = counts.get(emoji, 0)
+            label = f"{emoji} {count}" if count else emoji
+            if st.button(label, key=f"feed_react_{post['id']}_{i}"):
+                get_reaction_buffer(supabase).add(post['id'], emoji, get_anon_id())
+                st.success(f"Reacted with {emoji}")
+
 if __name__ == "__main__":
     main()
+    metrics.render_debug_panel()
@@ -1,6 +1,9 @@
 import streamlit as st
-from supabase_config import init_supabase, create_post, create_comment
-from ai_utils import get_ai_reply, moderate_content
+from supabase_config import get_anon_id
+from storage import get_storage_backend
+from ai_utils import moderate_content
+from ai_jobs import enqueue_ai_reply, poll_ai_reply, get_ai_worker_pool, AI_REPLY_POLL_SECONDS
+import metrics
 
 st.set_page_config(page_title="Post - Unfiltered Club", page_icon="✍️")
 
@@ -12,11 +15,15 @@ def main():
 
     st.title("✍️ Share Your Truth")
     
-    # Initialize Supabase
-    supabase = init_supabase()
-    if not supabase:
+    # Initialize storage, Supabase or a local SQLite database
+    storage = get_storage_backend()
+    if not storage:
         st.error("Failed to connect to database.")
         return
+    supabase = storage.client
+
+    # Make sure queued AI replies keep getting processed
+    get_ai_worker_pool()
 
     # Display previous AI response if it exists
     if st.session_state.ai_response:
@@ -66,25 +73,16 @@ def main():
                     st.error(f"Oops! {message}")
                 else:
                     try:
-                        # Get AI response first
-                        ai_response = get_ai_reply(confession, ai_mode)
-                        
-                        # Create post
+                        # Create post right away, the AI reply is written in the background
                         mood_clean = mood.split(" ")[1]  # Extract 'sad' from '😭 sad'
-                        post = create_post(supabase, confession, mood_clean)
+                        post = storage.create_post(confession, mood_clean, get_anon_id())
                         
-                        if post and ai_response:
-                            # Create AI comment with proper format
-                            ai_comment = f"AI ({ai_mode}): {ai_response}"
-                            comment = create_comment(supabase, post["id"], ai_comment, "ai_bot")
-                            
-                            if comment:
-                                st.success("✨ Your truth has been shared!")
-                                st.markdown(f"""
-                                <div class="ai-reply">
-                                    <strong>AI ({ai_mode}):</strong> {ai_response}
-                                </div>
-                                """, unsafe_allow_html=True)
+                        if post:
+                            enqueue_ai_reply(supabase, post["id"], ai_mode)
+                            st.success("✨ Your truth has been shared!")
+
+                            # Show the reply if it lands quickly, otherwise it turns up in the feed
+                            render_ai_reply(supabase, post["id"])
                     except Exception as e:
                         st.error(f"Something went wrong: {str(e)}")
 
@@ -102,5 +100,23 @@ def main():
     Remember: Everyone here is just as weird and struggling as you are. You're among friends. 🤝
     """)
 
+@st.fragment(run_every=AI_REPLY_POLL_SECONDS)
+def render_ai_reply(supabase, post_id):
+    """AI reply to a new post, checked for on a timer without blocking the page"""
+    ai_data, waiting = poll_ai_reply(supabase, post_id)
+    if ai_data:
+        st.session_state.ai_response = ai_data['response']
+        st.session_state.ai_mode = ai_data['mode']
+        st.markdown(f"""
+        <div class="ai-reply">
+            <strong>AI ({ai_data['mode']}):</strong> {ai_data['response']}
+        </div>
+        """, unsafe_allow_html=True)
+    elif waiting:
+        st.info("🤖 AI is crafting a response...")
+    else:
+        st.info("🤖 Your AI reply is on its way, check the feed in a moment!")
+
 if __name__ == "__main__":
     main()
+    metrics.render_debug_panel()
@@ -1,28 +1,28 @@
 import streamlit as st
-from supabase_config import init_supabase, get_posts
+from supabase_config import get_anon_id, get_user_profile
+from storage import get_storage_backend
+import metrics
 
 st.set_page_config(page_title="Profile - Unfiltered Club", page_icon="👤")
 
 def main():
     st.title("👤 Your Anonymous Profile")
     
-    # Initialize Supabase
-    supabase = init_supabase()
-    if not supabase:
+    # Initialize storage, Supabase or a local SQLite database
+    storage = get_storage_backend()
+    if not storage:
         st.error("Failed to connect to database.")
         return
+    supabase = storage.client
 
     # Display anonymous ID
-    if 'anon_id' not in st.session_state:
-        import uuid
-        st.session_state.anon_id = str(uuid.uuid4())[:8]
+    anon_id = get_anon_id()
 
-    st.markdown(f"**Your Anonymous ID:** `{st.session_state.anon_id}`")
+    st.markdown(f"**Your Anonymous ID:** `{anon_id[:8]}`")
     st.caption("This ID resets each session to keep you completely anonymous")
 
-    # Get user stats
-    from supabase_config import get_user_stats
-    stats = get_user_stats(supabase)
+    # Get user stats, one row maintained by database triggers
+    stats = get_user_profile(supabase, anon_id)
 
     # Display stats in columns
     st.subheader("📊 Your Impact Stats")
@@ -40,9 +40,24 @@ def main():
     if stats['posts'] > 0:
         # Display mood stats
         st.metric("Unique Moods Expressed", stats['unique_moods'])
+        if stats['favorite_mood']:
+            st.caption(f"Your go-to mood: **{stats['favorite_mood']}**")
+        if stats['moods']:
+            st.bar_chart({"posts": stats['moods']})
     else:
         st.info("Start posting confessions to track your mood journey!")
 
+    # Community-wide totals
+    community = storage.get_user_stats()
+    st.subheader("🌍 Community Pulse")
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("All Confessions", community['posts'])
+    with col2:
+        st.metric("All Comments", community['comments'])
+    with col3:
+        st.metric("All Reactions", community['reactions'])
+
     # Achievements section
     st.subheader("🏆 Anonymous Achievements")
     
@@ -119,14 +134,19 @@ def main():
     st.markdown("---")
     st.subheader("⚠️ Danger Zone")
     if st.button("🗑️ Delete All Posts", type="primary", use_container_width=True):
-        with st.spinner("Deleting all data..."):
-            from supabase_config import delete_all_data
-            success, message = delete_all_data(supabase)
-            if success:
-                st.success("✅ All data has been deleted successfully!")
-                st.rerun()
-            else:
-                st.error(f"❌ {message}")
+        progress_bar = st.progress(0.0, text="Deleting all data...")
+        success, message = storage.delete_all_data(
+            progress=lambda deleted, total: progress_bar.progress(
+                deleted / total if total else 1.0, text=f"Deleted {deleted:,} of {total:,} posts..."
+            )
+        )
+        progress_bar.empty()
+        if success:
+            st.success("✅ All data has been deleted successfully!")
+            st.rerun()
+        else:
+            st.error(f"❌ {message}")
 
 if __name__ == "__main__":
     main()
+    metrics.render_debug_panel()
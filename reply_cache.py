@@ -0,0 +1,150 @@
+import os
+import re
+import time
+import sqlite3
+import hashlib
+import threading
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Cache settings, all overridable through the environment
+AI_REPLY_CACHE_PATH = os.getenv("AI_REPLY_CACHE_PATH", os.path.join(".cache", "ai_replies.sqlite3"))
+AI_REPLY_CACHE_MAX_ENTRIES = int(os.getenv("AI_REPLY_CACHE_MAX_ENTRIES", "10000"))
+AI_REPLY_CACHE_MAX_AGE = float(os.getenv("AI_REPLY_CACHE_MAX_AGE", str(7 * 24 * 3600)))
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+def normalize_text(text: str):
+    """Normalize post text so trivial edits (case, spacing) share a cache entry"""
+    return _WHITESPACE_RE.sub(" ", (text or "").strip().lower())
+
+def text_hash(text: str):
+    """Stable hash of the normalized post text"""
+    return hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+
+class ReplyCache:
+    """Process-wide AI reply cache stored in SQLite so it survives restarts.
+
+    Entries are keyed by (text hash, mode, model). Entries older than max_age
+    seconds are treated as misses, and the least recently used entries are
+    evicted once the cache grows past max_entries.
+    """
+
+    def __init__(self, path: str = AI_REPLY_CACHE_PATH, max_entries: int = AI_REPLY_CACHE_MAX_ENTRIES,
+                 max_age: float = AI_REPLY_CACHE_MAX_AGE):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        # Shared across the reply worker threads, guarded by self._lock
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS ai_replies (
+                text_hash TEXT NOT NULL,
+                mode TEXT NOT NULL,
+                model TEXT NOT NULL,
+                reply TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_used REAL NOT NULL,
+                PRIMARY KEY (text_hash, mode, model)
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ai_replies_last_used_idx ON ai_replies(last_used)")
+        self._conn.commit()
+
+    def get(self, text: str, mode: str, model: str):
+        """Return the cached reply for this post text, or None on a miss"""
+        return self.get_by_hash(text_hash(text), mode, model)
+
+    def get_by_hash(self, key: str, mode: str, model: str, record: bool = True):
+        """Return the cached reply for an already hashed post text, or None on a miss.
+
+        With record=False the lookup leaves the hit/miss counters and expired
+        rows alone, for probing candidates such as near-duplicates.
+        """
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT reply, created_at FROM ai_replies WHERE text_hash = ? AND mode = ? AND model = ?",
+                (key, mode, model)
+            ).fetchone()
+
+            if row is None or now - row[1] > self.max_age:
+                if row is not None and record:
+                    self._conn.execute(
+                        "DELETE FROM ai_replies WHERE text_hash = ? AND mode = ? AND model = ?",
+                        (key, mode, model)
+                    )
+                    self._conn.commit()
+                if record:
+                    self.misses += 1
+                return None
+
+            self._conn.execute(
+                "UPDATE ai_replies SET last_used = ? WHERE text_hash = ? AND mode = ? AND model = ?",
+                (now, key, mode, model)
+            )
+            self._conn.commit()
+            if record:
+                self.hits += 1
+            return row[0]
+
+    def set(self, text: str, mode: str, model: str, reply: str):
+        """Store a reply and evict old or excess entries"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO ai_replies (text_hash, mode, model, reply, created_at, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (text_hash(text), mode, model, reply, now, now)
+            )
+            self._evict(now)
+            self._conn.commit()
+
+    def _evict(self, now: float):
+        """Drop expired entries, then the least recently used ones over the size limit"""
+        self._conn.execute("DELETE FROM ai_replies WHERE created_at < ?", (now - self.max_age,))
+        self._conn.execute(
+            "DELETE FROM ai_replies WHERE rowid IN "
+            "(SELECT rowid FROM ai_replies ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,)
+        )
+
+    def clear(self):
+        """Remove every cached reply"""
+        with self._lock:
+            self._conn.execute("DELETE FROM ai_replies")
+            self._conn.commit()
+
+    def stats(self):
+        """Get hit/miss counters and the current cache size"""
+        with self._lock:
+            size = self._conn.execute("SELECT COUNT(*) FROM ai_replies").fetchone()[0]
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "size": size
+        }
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_reply_cache():
+    """Get the shared reply cache for this process"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ReplyCache()
+    return _cache
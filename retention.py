@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Retention purge: delete posts older than RETENTION_DAYS, with their
+comments, reactions and AI reply jobs, in small chunks.
+
+Runs in the background of the app when RETENTION_DAYS is set, or by hand /
+from cron:
+
+    python retention.py --days 90
+    python retention.py --days 90 --dry-run
+"""
+
+import os
+import time
+import logging
+import argparse
+import threading
+from datetime import datetime, timedelta, timezone
+import streamlit as st
+from supabase import Client
+from dotenv import load_dotenv
+from metrics import timed
+from supabase_config import init_supabase, delete_posts_in_chunks, DELETE_CHUNK_SIZE
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Posts older than this many days are purged; 0 keeps everything
+RETENTION_DAYS = int(os.getenv("RETENTION_DAYS", "0"))
+# Seconds between background purges
+RETENTION_INTERVAL = float(os.getenv("RETENTION_INTERVAL", "3600"))
+
+def retention_cutoff(days: int):
+    """ISO timestamp `days` ago, in UTC"""
+    return (datetime.now(timezone.utc) - timedelta(days=days)).isoformat()
+
+@timed("retention.purge_expired_posts")
+def purge_expired_posts(supabase: Client, days: int = RETENTION_DAYS, chunk_size: int = DELETE_CHUNK_SIZE, progress=None):
+    """Delete posts older than `days` days, oldest first; returns the number deleted"""
+    if days <= 0:
+        return 0
+    return delete_posts_in_chunks(supabase, before=retention_cutoff(days), chunk_size=chunk_size, progress=progress)
+
+class RetentionWorker:
+    """Background thread running the retention purge every `interval` seconds.
+
+    Every app process runs one; concurrent purges just find less to delete.
+    `get_client` is called before each purge, so the worker follows the
+    shared client when init_supabase() replaces a dead one.
+    """
+
+    def __init__(self, get_client=init_supabase, days: int = RETENTION_DAYS, interval: float = RETENTION_INTERVAL):
+        self.get_client = get_client
+        self.days = days
+        self.interval = interval
+        self._thread = threading.Thread(target=self._run, name="retention-worker", daemon=True)
+
+    def start(self):
+        """Start the worker thread"""
+        self._thread.start()
+        return self
+
+    def _run(self):
+        while True:
+            try:
+                supabase = self.get_client()
+                if supabase is None:
+                    logger.warning("No database connection for the retention purge")
+                    deleted = 0
+                else:
+                    deleted = purge_expired_posts(supabase, self.days)
+                if deleted:
+                    logger.info("Retention purge deleted %d posts older than %d days", deleted, self.days)
+            except Exception:
+                logger.exception("Retention purge failed")
+            time.sleep(self.interval)
+
+@st.cache_resource(show_spinner=False)
+def get_retention_worker():
+    """Start the retention worker once per process, if RETENTION_DAYS is set"""
+    if RETENTION_DAYS <= 0:
+        return None
+    return RetentionWorker().start()
+
+def main():
+    parser = argparse.ArgumentParser(description="Delete posts older than a number of days")
+    parser.add_argument("--days", type=int, default=RETENTION_DAYS, help="keep posts newer than this")
+    parser.add_argument("--chunk-size", type=int, default=DELETE_CHUNK_SIZE, help="posts deleted per chunk")
+    parser.add_argument("--dry-run", action="store_true", help="only count what would be deleted")
+    args = parser.parse_args()
+
+    if args.days <= 0:
+        parser.error("set --days or RETENTION_DAYS to a positive number")
+
+    supabase = init_supabase()
+    if not supabase:
+        raise SystemExit("Failed to connect to database. Please check your configuration.")
+
+    cutoff = retention_cutoff(args.days)
+    if args.dry_run:
+        result = supabase.table("posts").select("id", count="exact", head=True).lt("created_at", cutoff).execute()
+        print(f"🧹 {result.count or 0:,} posts older than {args.days} days would be deleted")
+        return
+
+    progress = lambda deleted, total: print(f"🧹 Deleted {deleted:,}/{total:,} posts", end="\r")
+    deleted = purge_expired_posts(supabase, args.days, args.chunk_size, progress)
+    print(f"\n✅ Purged {deleted:,} posts older than {args.days} days")
+
+if __name__ == "__main__":
+    main()
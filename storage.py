@@ -0,0 +1,793 @@
+import os
+import re
+import abc
+import json
+import uuid
+import sqlite3
+import threading
+from datetime import datetime, timedelta, timezone
+import streamlit as st
+from supabase import Client
+from dotenv import load_dotenv
+import supabase_config
+from supabase_config import report_error
+from metrics import timed
+
+load_dotenv()
+
+# "supabase" (default) or "sqlite" for a local single-node database
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "supabase").lower()
+SQLITE_DB_PATH = os.getenv("SQLITE_DB_PATH", ".data/unfiltered_club.sqlite3")
+
+# SQLite version of database_setup.sql: same tables, indexes, view and
+# profile counter triggers. Timestamps are ISO-8601 UTC text, which sorts
+# in time order.
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS posts (
+    id TEXT PRIMARY KEY,
+    content TEXT NOT NULL,
+    user_id TEXT DEFAULT NULL,
+    mood TEXT NOT NULL CHECK (mood IN ('sad', 'angry', 'meh', 'lol', 'happy', 'confused')),
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS comments (
+    id TEXT PRIMARY KEY,
+    post_id TEXT NOT NULL REFERENCES posts(id) ON DELETE CASCADE,
+    content TEXT NOT NULL,
+    user_id TEXT DEFAULT NULL,
+    is_ai INTEGER NOT NULL DEFAULT 0,
+    ai_mode TEXT DEFAULT NULL,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS reactions (
+    id TEXT PRIMARY KEY,
+    post_id TEXT NOT NULL REFERENCES posts(id) ON DELETE CASCADE,
+    emoji TEXT NOT NULL,
+    user_id TEXT NOT NULL DEFAULT 'anon',
+    created_at TEXT NOT NULL,
+    UNIQUE(post_id, user_id)
+);
+
+CREATE TABLE IF NOT EXISTS user_profiles (
+    id TEXT PRIMARY KEY,
+    anonymous_id TEXT UNIQUE NOT NULL,
+    total_posts INTEGER DEFAULT 0,
+    total_comments INTEGER DEFAULT 0,
+    total_reactions INTEGER DEFAULT 0,
+    favorite_mood TEXT DEFAULT 'meh',
+    mood_counts TEXT NOT NULL DEFAULT '{}',
+    created_at TEXT NOT NULL,
+    last_active TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS ai_reply_jobs (
+    id TEXT PRIMARY KEY,
+    post_id TEXT NOT NULL UNIQUE REFERENCES posts(id) ON DELETE CASCADE,
+    mode TEXT NOT NULL DEFAULT 'wise',
+    status TEXT NOT NULL DEFAULT 'pending' CHECK (status IN ('pending', 'running', 'done', 'failed')),
+    attempts INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT DEFAULT NULL,
+    run_after TEXT NOT NULL,
+    locked_until TEXT DEFAULT NULL,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS posts_mood_idx ON posts(mood);
+CREATE INDEX IF NOT EXISTS comments_post_id_idx ON comments(post_id);
+CREATE INDEX IF NOT EXISTS comments_ai_post_id_idx ON comments(post_id, created_at) WHERE is_ai;
+CREATE INDEX IF NOT EXISTS reactions_post_id_idx ON reactions(post_id);
+CREATE INDEX IF NOT EXISTS ai_reply_jobs_ready_idx ON ai_reply_jobs(run_after) WHERE status IN ('pending', 'running');
+CREATE INDEX IF NOT EXISTS posts_created_at_id_idx ON posts(created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS posts_mood_created_at_id_idx ON posts(mood, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS comments_created_at_id_idx ON comments(created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS reactions_created_at_id_idx ON reactions(created_at DESC, id DESC);
+
+CREATE VIEW IF NOT EXISTS posts_with_stats AS
+SELECT
+    p.*,
+    COALESCE(c.comment_count, 0) AS comment_count,
+    COALESCE(r.reaction_count, 0) AS reaction_count,
+    COALESCE(r.reactions, '[]') AS reactions
+FROM posts p
+LEFT JOIN (
+    SELECT post_id, COUNT(*) AS comment_count
+    FROM comments
+    GROUP BY post_id
+) c ON p.id = c.post_id
+LEFT JOIN (
+    SELECT post_id, COUNT(*) AS reaction_count, json_group_array(emoji) AS reactions
+    FROM reactions
+    GROUP BY post_id
+) r ON p.id = r.post_id;
+
+-- Full-text index over post content, the counterpart of posts_content_search_idx.
+-- It follows posts by rowid, so rebuild it after a VACUUM:
+--   INSERT INTO posts_fts(posts_fts) VALUES ('rebuild');
+CREATE VIRTUAL TABLE IF NOT EXISTS posts_fts USING fts5(content, content='posts', tokenize='porter unicode61');
+
+CREATE TRIGGER IF NOT EXISTS posts_fts_insert AFTER INSERT ON posts
+BEGIN
+    INSERT INTO posts_fts (rowid, content) VALUES (NEW.rowid, NEW.content);
+END;
+
+CREATE TRIGGER IF NOT EXISTS posts_fts_delete AFTER DELETE ON posts
+BEGIN
+    INSERT INTO posts_fts (posts_fts, rowid, content) VALUES ('delete', OLD.rowid, OLD.content);
+END;
+
+CREATE TRIGGER IF NOT EXISTS posts_fts_update AFTER UPDATE OF content ON posts
+BEGIN
+    INSERT INTO posts_fts (posts_fts, rowid, content) VALUES ('delete', OLD.rowid, OLD.content);
+    INSERT INTO posts_fts (rowid, content) VALUES (NEW.rowid, NEW.content);
+END;
+
+-- Profile counters, kept in step like the track_*_profile_counts() triggers
+CREATE TRIGGER IF NOT EXISTS posts_profile_counts_insert AFTER INSERT ON posts
+WHEN NEW.user_id IS NOT NULL AND NEW.user_id != 'anon'
+BEGIN
+    INSERT INTO user_profiles (id, anonymous_id, total_posts, mood_counts, created_at, last_active)
+    VALUES (lower(hex(randomblob(16))), NEW.user_id, 1, json_object(NEW.mood, 1), strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now'), strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now'))
+    ON CONFLICT (anonymous_id) DO UPDATE SET
+        total_posts = MAX(total_posts + 1, 0),
+        mood_counts = json_set(mood_counts, '$.' || NEW.mood,
+            MAX(COALESCE(json_extract(mood_counts, '$.' || NEW.mood), 0) + 1, 0)),
+        last_active = strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now');
+    UPDATE user_profiles SET favorite_mood = COALESCE((
+        SELECT key FROM json_each(user_profiles.mood_counts)
+        WHERE value > 0 ORDER BY value DESC, key LIMIT 1
+    ), 'meh')
+    WHERE anonymous_id = NEW.user_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS posts_profile_counts_delete AFTER DELETE ON posts
+WHEN OLD.user_id IS NOT NULL AND OLD.user_id != 'anon'
+BEGIN
+    INSERT INTO user_profiles (id, anonymous_id, total_posts, mood_counts, created_at, last_active)
+    VALUES (lower(hex(randomblob(16))), OLD.user_id, 0, json_object(OLD.mood, 0), strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now'), strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now'))
+    ON CONFLICT (anonymous_id) DO UPDATE SET
+        total_posts = MAX(total_posts - 1, 0),
+        mood_counts = json_set(mood_counts, '$.' || OLD.mood,
+            MAX(COALESCE(json_extract(mood_counts, '$.' || OLD.mood), 0) - 1, 0)),
+        last_active = strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now');
+    UPDATE user_profiles SET favorite_mood = COALESCE((
+        SELECT key FROM json_each(user_profiles.mood_counts)
+        WHERE value > 0 ORDER BY value DESC, key LIMIT 1
+    ), 'meh')
+    WHERE anonymous_id = OLD.user_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS comments_profile_counts_insert AFTER INSERT ON comments
+WHEN NEW.user_id IS NOT NULL AND NEW.user_id != 'anon' AND NOT NEW.is_ai
+BEGIN
+    INSERT INTO user_profiles (id, anonymous_id, total_comments, mood_counts, created_at, last_active)
+    VALUES (lower(hex(randomblob(16))), NEW.user_id, 1, '{}', strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now'), strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now'))
+    ON CONFLICT (anonymous_id) DO UPDATE SET
+        total_comments = MAX(total_comments + 1, 0),
+        last_active = strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now');
+END;
+
+CREATE TRIGGER IF NOT EXISTS comments_profile_counts_delete AFTER DELETE ON comments
+WHEN OLD.user_id IS NOT NULL AND OLD.user_id != 'anon' AND NOT OLD.is_ai
+BEGIN
+    INSERT INTO user_profiles (id, anonymous_id, total_comments, mood_counts, created_at, last_active)
+    VALUES (lower(hex(randomblob(16))), OLD.user_id, 0, '{}', strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now'), strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now'))
+    ON CONFLICT (anonymous_id) DO UPDATE SET
+        total_comments = MAX(total_comments - 1, 0),
+        last_active = strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now');
+END;
+
+CREATE TRIGGER IF NOT EXISTS reactions_profile_counts_insert AFTER INSERT ON reactions
+WHEN NEW.user_id IS NOT NULL AND NEW.user_id != 'anon'
+BEGIN
+    INSERT INTO user_profiles (id, anonymous_id, total_reactions, mood_counts, created_at, last_active)
+    VALUES (lower(hex(randomblob(16))), NEW.user_id, 1, '{}', strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now'), strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now'))
+    ON CONFLICT (anonymous_id) DO UPDATE SET
+        total_reactions = MAX(total_reactions + 1, 0),
+        last_active = strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now');
+END;
+
+CREATE TRIGGER IF NOT EXISTS reactions_profile_counts_delete AFTER DELETE ON reactions
+WHEN OLD.user_id IS NOT NULL AND OLD.user_id != 'anon'
+BEGIN
+    INSERT INTO user_profiles (id, anonymous_id, total_reactions, mood_counts, created_at, last_active)
+    VALUES (lower(hex(randomblob(16))), OLD.user_id, 0, '{}', strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now'), strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now'))
+    ON CONFLICT (anonymous_id) DO UPDATE SET
+        total_reactions = MAX(total_reactions - 1, 0),
+        last_active = strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now');
+END;
+"""
+
+# Columns stored as JSON text or 0/1 that PostgREST would return as JSON/booleans
+JSON_COLUMNS = {"reactions", "mood_counts"}
+BOOL_COLUMNS = {"is_ai"}
+
+def _now():
+    """Current UTC time as ISO-8601, like PostgREST returns timestamps"""
+    return datetime.now(timezone.utc).isoformat()
+
+def connect_sqlite(path: str):
+    """Open a SQLite database in WAL mode and create the schema if needed"""
+    if path != ":memory:" and os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    db = sqlite3.connect(path, check_same_thread=False)
+    db.row_factory = sqlite3.Row
+    db.execute("PRAGMA journal_mode = WAL")
+    db.execute("PRAGMA synchronous = NORMAL")
+    db.execute("PRAGMA foreign_keys = ON")
+    db.execute("PRAGMA busy_timeout = 5000")
+    had_fts = db.execute("SELECT 1 FROM sqlite_master WHERE name = 'posts_fts'").fetchone()
+    db.executescript(SQLITE_SCHEMA)
+    if not had_fts:
+        # Index posts written before the full-text table existed
+        db.execute("INSERT INTO posts_fts (posts_fts) VALUES ('rebuild')")
+        db.commit()
+    return db
+
+_WORD_RE = re.compile(r"\w+")
+
+def fts_query(text: str):
+    """Turn free text into an FTS5 query matching every word, like websearch_to_tsquery"""
+    return " ".join(f'"{word}"' for word in _WORD_RE.findall(text))
+
+def _rows(cursor):
+    """Turn SQLite rows into dicts shaped like PostgREST JSON"""
+    rows = []
+    for row in cursor.fetchall():
+        row = dict(row)
+        for column in JSON_COLUMNS & row.keys():
+            if isinstance(row[column], str):
+                row[column] = json.loads(row[column])
+        for column in BOOL_COLUMNS & row.keys():
+            row[column] = bool(row[column])
+        rows.append(row)
+    return rows
+
+# PostgREST-compatible client over SQLite, so the rest of supabase_config
+# (paging, AI reply jobs, profiles) runs unchanged on the local database
+
+_NAME_RE = re.compile(r"^\w+$")
+_CONDITION_RE = re.compile(r'^(\w+)\.(\w+)\.(?:"(.*)"|(.*))$', re.DOTALL)
+_NUMBER_RE = re.compile(r"^-?\d+(\.\d+)?$")
+_OPERATORS = {"eq": "=", "neq": "!=", "lt": "<", "lte": "<=", "gt": ">", "gte": ">="}
+
+def _name(name: str):
+    """Guard identifiers that end up in SQL text"""
+    if not _NAME_RE.match(name):
+        raise ValueError(f"Bad identifier: {name}")
+    return name
+
+def _to_sql_value(value):
+    if isinstance(value, bool):
+        return int(value)
+    if isinstance(value, (dict, list)):
+        return json.dumps(value)
+    return value
+
+def _from_filter_string(value: str):
+    """Values inside filter strings arrive as text; numbers compare as numbers,
+    also against computed view columns that have no type affinity"""
+    if value is not None and _NUMBER_RE.match(value):
+        return float(value) if "." in value else int(value)
+    return value
+
+def _split_top_level(text: str):
+    """Split a PostgREST logic string on commas outside parentheses and quotes"""
+    parts, depth, quoted, current = [], 0, False, ""
+    for char in text:
+        if char == '"':
+            quoted = not quoted
+        elif not quoted and char == "(":
+            depth += 1
+        elif not quoted and char == ")":
+            depth -= 1
+        elif not quoted and depth == 0 and char == ",":
+            parts.append(current)
+            current = ""
+            continue
+        current += char
+    if current:
+        parts.append(current)
+    return parts
+
+def _logic_to_sql(text: str, joiner: str = "OR"):
+    """Translate an `or` filter string into a SQL expression and parameters"""
+    clauses, params = [], []
+    for part in _split_top_level(text):
+        if part.startswith(("and(", "or(")):
+            kind, inner = part.split("(", 1)
+            sql, inner_params = _logic_to_sql(inner[:-1], kind.upper())
+            clauses.append(sql)
+            params.extend(inner_params)
+            continue
+        match = _CONDITION_RE.match(part)
+        if not match or match.group(2) not in _OPERATORS and match.group(2) != "in":
+            raise ValueError(f"Unsupported filter: {part}")
+        column, op, quoted, bare = match.groups()
+        if op == "in":
+            # column.in.(a,b,"c,d")
+            if not bare or not (bare.startswith("(") and bare.endswith(")")):
+                raise ValueError(f"Unsupported filter: {part}")
+            values = [value[1:-1] if value.startswith('"') else value for value in _split_top_level(bare[1:-1])]
+            clauses.append(f"{_name(column)} IN ({','.join('?' * len(values))})" if values else "0")
+            params.extend(_from_filter_string(value) for value in values)
+            continue
+        clauses.append(f"{_name(column)} {_OPERATORS[op]} ?")
+        params.append(_from_filter_string(quoted if quoted is not None else bare))
+    return "(" + f" {joiner} ".join(clauses) + ")", params
+
+class SQLiteResponse:
+    """Mimics postgrest's APIResponse"""
+
+    def __init__(self, data, count=None):
+        self.data = data
+        self.count = count
+
+class SQLiteQuery:
+    """Chainable query mirroring the supabase-py builder, run as SQL on execute()"""
+
+    # Tables with an updated_at column, bumped on every update like the Postgres triggers
+    UPDATED_AT_TABLES = ("posts", "comments", "ai_reply_jobs")
+
+    def __init__(self, client, table: str):
+        self.client = client
+        self.table = _name(table)
+        self.action = "select"
+        self.columns = "*"
+        self.count = None
+        self.head = False
+        self.returning = "representation"
+        self.payload = None
+        self.on_conflict = None
+        self.ignore_duplicates = False
+        self.where = []
+        self.params = []
+        self.orders = []
+        self.offset = 0
+        self.row_limit = None
+
+    def select(self, columns: str = "*", count: str = None, head: bool = False):
+        self.columns = columns
+        self.count = count
+        self.head = head
+        return self
+
+    def insert(self, data):
+        self.action = "insert"
+        self.payload = data
+        return self
+
+    def upsert(self, data, on_conflict: str = None, ignore_duplicates: bool = False):
+        self.action = "upsert"
+        self.payload = data
+        self.on_conflict = on_conflict
+        self.ignore_duplicates = ignore_duplicates
+        return self
+
+    def update(self, data: dict):
+        self.action = "update"
+        self.payload = data
+        return self
+
+    def delete(self, count: str = None, returning: str = "representation"):
+        self.action = "delete"
+        self.count = count
+        self.returning = returning
+        return self
+
+    def _filter(self, op: str, column: str, value):
+        if value is None and op in ("eq", "neq"):
+            self.where.append(f"{_name(column)} IS {'NOT ' if op == 'neq' else ''}NULL")
+        else:
+            self.where.append(f"{_name(column)} {_OPERATORS[op]} ?")
+            self.params.append(_to_sql_value(value))
+        return self
+
+    def eq(self, column: str, value):
+        return self._filter("eq", column, value)
+
+    def neq(self, column: str, value):
+        return self._filter("neq", column, value)
+
+    def lt(self, column: str, value):
+        return self._filter("lt", column, value)
+
+    def lte(self, column: str, value):
+        return self._filter("lte", column, value)
+
+    def gt(self, column: str, value):
+        return self._filter("gt", column, value)
+
+    def gte(self, column: str, value):
+        return self._filter("gte", column, value)
+
+    def in_(self, column: str, values):
+        values = [_to_sql_value(v) for v in values]
+        if values:
+            self.where.append(f"{_name(column)} IN ({','.join('?' * len(values))})")
+            self.params.extend(values)
+        else:
+            self.where.append("0")
+        return self
+
+    def or_(self, filters: str):
+        sql, params = _logic_to_sql(filters)
+        self.where.append(sql)
+        self.params.extend(params)
+        return self
+
+    def order(self, column: str, desc: bool = False):
+        self.orders.append(f"{_name(column)} {'DESC' if desc else 'ASC'}")
+        return self
+
+    def limit(self, count: int):
+        self.row_limit = count
+        return self
+
+    def range(self, start: int, end: int):
+        self.offset = start
+        self.row_limit = end - start + 1
+        return self
+
+    def _where_sql(self):
+        return f" WHERE {' AND '.join(self.where)}" if self.where else ""
+
+    def execute(self):
+        self.client.round_trip()
+        with self.client.lock:
+            try:
+                if self.action == "select":
+                    return self._select()
+                if self.action in ("insert", "upsert"):
+                    response = self._write()
+                elif self.action == "update":
+                    payload = dict(self.payload)
+                    if self.table in self.UPDATED_AT_TABLES:
+                        payload.setdefault("updated_at", _now())
+                    assignments = ", ".join(f"{_name(column)} = ?" for column in payload)
+                    response = SQLiteResponse(_rows(self.client.db.execute(
+                        f"UPDATE {self.table} SET {assignments}{self._where_sql()} RETURNING *",
+                        [_to_sql_value(v) for v in payload.values()] + self.params
+                    )))
+                elif self.returning == "minimal":
+                    cursor = self.client.db.execute(f"DELETE FROM {self.table}{self._where_sql()}", self.params)
+                    response = SQLiteResponse([], cursor.rowcount if self.count else None)
+                else:
+                    rows = _rows(self.client.db.execute(
+                        f"DELETE FROM {self.table}{self._where_sql()} RETURNING *", self.params
+                    ))
+                    response = SQLiteResponse(rows, len(rows) if self.count else None)
+                self.client.db.commit()
+                return response
+            except Exception:
+                self.client.db.rollback()
+                raise
+
+    def _select(self):
+        where = self._where_sql()
+        count = None
+        if self.count:
+            count = self.client.db.execute(f"SELECT COUNT(*) FROM {self.table}{where}", self.params).fetchone()[0]
+        if self.head:
+            return SQLiteResponse([], count)
+
+        columns = "*" if self.columns.strip() == "*" else ", ".join(_name(c.strip()) for c in self.columns.split(","))
+        sql = f"SELECT {columns} FROM {self.table}{where}"
+        if self.orders:
+            sql += " ORDER BY " + ", ".join(self.orders)
+        if self.row_limit is not None:
+            sql += f" LIMIT {int(self.row_limit)} OFFSET {int(self.offset)}"
+        return SQLiteResponse(_rows(self.client.db.execute(sql, self.params)), count)
+
+    def _write(self):
+        items = self.payload if isinstance(self.payload, list) else [self.payload]
+        written = []
+        for item in items:
+            row = {"id": str(uuid.uuid4()), "created_at": _now()}
+            if self.table in self.UPDATED_AT_TABLES:
+                row["updated_at"] = row["created_at"]
+            if self.table == "ai_reply_jobs":
+                row["run_after"] = row["created_at"]
+            if self.table == "user_profiles":
+                row["last_active"] = row["created_at"]
+            row.update(item)
+
+            columns = [_name(column) for column in row]
+            sql = f"INSERT INTO {self.table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+            if self.action == "upsert":
+                keys = ", ".join(_name(k.strip()) for k in (self.on_conflict or "id").split(","))
+                updates = ", ".join(f"{c} = excluded.{c}" for c in item if c not in ("id", "created_at"))
+                if self.ignore_duplicates or not updates:
+                    sql += f" ON CONFLICT ({keys}) DO NOTHING"
+                else:
+                    sql += f" ON CONFLICT ({keys}) DO UPDATE SET {updates}"
+            written.extend(_rows(self.client.db.execute(sql + " RETURNING *", [_to_sql_value(v) for v in row.values()])))
+        return SQLiteResponse(written)
+
+class SQLiteRPC:
+    """Deferred RPC call, dispatched to a SQLiteClient._rpc_<name> method"""
+
+    def __init__(self, client, name: str, params: dict):
+        self.client = client
+        self.name = name
+        self.params = params or {}
+
+    def execute(self):
+        self.client.round_trip()
+        handler = getattr(self.client, f"_rpc_{self.name}", None)
+        if handler is None:
+            raise Exception(f"Could not find the function public.{self.name}")
+        with self.client.lock:
+            try:
+                data = handler(**self.params)
+                self.client.db.commit()
+                return SQLiteResponse(data)
+            except Exception:
+                self.client.db.rollback()
+                raise
+
+class SQLiteClient:
+    """Drop-in for the Supabase client backed by a local SQLite database.
+
+    Implements the query builder calls and RPCs the app uses. One connection
+    is shared by all sessions and worker threads behind a lock; WAL mode lets
+    other processes (CLI tools) read while the app writes.
+    """
+
+    def __init__(self, path: str = SQLITE_DB_PATH):
+        self.path = path
+        self.db = connect_sqlite(path)
+        self.lock = threading.RLock()
+
+    def round_trip(self):
+        """Called once per request; a no-op hook for instrumentation"""
+
+    def table(self, name: str):
+        return SQLiteQuery(self, name)
+
+    def rpc(self, name: str, params: dict = None):
+        return SQLiteRPC(self, name, params)
+
+    # RPCs from database_setup.sql
+
+    def _rpc_reaction_counts(self, post_ids):
+        post_ids = list(post_ids)
+        if not post_ids:
+            return []
+        return _rows(self.db.execute(
+            f"SELECT post_id, emoji, COUNT(*) AS count FROM reactions "
+            f"WHERE post_id IN ({','.join('?' * len(post_ids))}) GROUP BY post_id, emoji",
+            post_ids
+        ))
+
+    def _rpc_get_app_stats(self):
+        count = lambda table: self.db.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+        return {
+            "posts": count("posts"),
+            "comments": count("comments"),
+            "reactions": count("reactions"),
+            "moods": dict(self.db.execute("SELECT mood, COUNT(*) FROM posts GROUP BY mood").fetchall())
+        }
+
+    def _rpc_search_posts(self, search_query, mood_filter=None, result_limit=20,
+                          after_rank=None, after_created_at=None, after_id=None):
+        match = fts_query(search_query)
+        if not match:
+            return []
+        conditions, params = [], [match]
+        if mood_filter:
+            conditions.append("p.mood = ?")
+            params.append(mood_filter)
+        if after_rank is not None:
+            conditions.append("(m.rank, p.created_at, p.id) < (?, ?, ?)")
+            params.extend([after_rank, after_created_at, after_id])
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+        # bm25() is lower for better matches; negate it so rank sorts like ts_rank
+        return _rows(self.db.execute(
+            f"""
+            SELECT
+                p.*,
+                (SELECT COUNT(*) FROM comments c WHERE c.post_id = p.id) AS comment_count,
+                (SELECT COUNT(*) FROM reactions r WHERE r.post_id = p.id) AS reaction_count,
+                (SELECT json_group_array(emoji) FROM reactions r WHERE r.post_id = p.id) AS reactions,
+                m.rank
+            FROM (SELECT rowid, -bm25(posts_fts) AS rank FROM posts_fts WHERE posts_fts MATCH ?) m
+            JOIN posts p ON p.rowid = m.rowid{where}
+            ORDER BY m.rank DESC, p.created_at DESC, p.id DESC
+            LIMIT ?
+            """,
+            params + [result_limit]
+        ))
+
+    def _rpc_claim_ai_reply_jobs(self, batch_size=1, lease_seconds=120):
+        now = _now()
+        locked_until = (datetime.now(timezone.utc) + timedelta(seconds=lease_seconds)).isoformat()
+        return _rows(self.db.execute(
+            """
+            UPDATE ai_reply_jobs
+            SET status = 'running', attempts = attempts + 1, locked_until = ?, updated_at = ?
+            WHERE id IN (
+                SELECT id FROM ai_reply_jobs
+                WHERE (status = 'pending' AND run_after <= ?)
+                   OR (status = 'running' AND locked_until < ?)
+                ORDER BY run_after
+                LIMIT ?
+            )
+            RETURNING *
+            """,
+            (locked_until, now, now, now, batch_size)
+        ))
+
+class StorageBackend(abc.ABC):
+    """Repository interface for the core data operations.
+
+    Return values match the supabase_config functions of the same name.
+    """
+
+    @abc.abstractmethod
+    def create_post(self, content: str, mood: str, user_id: str = None):
+        """Create a post; returns the new row or None"""
+
+    @abc.abstractmethod
+    def get_posts(self, limit: int = 50, sort: str = "latest", mood: str = None, before: tuple = None):
+        """A page of posts in `sort` order, optionally by mood and after a keyset cursor"""
+
+    @abc.abstractmethod
+    def create_comment(self, post_id: str, content: str, user_id: str = None, ai_mode: str = None):
+        """Add a comment; user_id "ai_bot" stores an AI reply in `ai_mode`"""
+
+    @abc.abstractmethod
+    def get_comments(self, post_id: str):
+        """A post's comments, oldest first"""
+
+    @abc.abstractmethod
+    def add_reaction(self, post_id: str, emoji: str, user_id: str = None):
+        """Set a user's reaction to a post; returns the row or None"""
+
+    @abc.abstractmethod
+    def count_reactions(self, post_id: str):
+        """Reaction counts per emoji for a post"""
+
+    @abc.abstractmethod
+    def get_user_stats(self, user_id: str = None):
+        """Community totals and mood counts"""
+
+    @abc.abstractmethod
+    def delete_all_data(self, progress=None):
+        """Delete every post with its comments and reactions; returns (success, message)"""
+
+class SupabaseBackend(StorageBackend):
+    """The hosted Supabase database, through the supabase_config functions"""
+
+    def __init__(self, client: Client):
+        self.client = client
+
+    def create_post(self, content: str, mood: str, user_id: str = None):
+        return supabase_config.create_post(self.client, content, mood, user_id)
+
+    def get_posts(self, limit: int = 50, sort: str = "latest", mood: str = None, before: tuple = None):
+        return supabase_config.get_posts(self.client, limit=limit, sort=sort, mood=mood, before=before)
+
+    def create_comment(self, post_id: str, content: str, user_id: str = None, ai_mode: str = None):
+        return supabase_config.create_comment(self.client, post_id, content, user_id, ai_mode=ai_mode)
+
+    def get_comments(self, post_id: str):
+        return supabase_config.get_comments(self.client, post_id)
+
+    def add_reaction(self, post_id: str, emoji: str, user_id: str = None):
+        return supabase_config.add_reaction(self.client, post_id, emoji, user_id)
+
+    def count_reactions(self, post_id: str):
+        return supabase_config.count_reactions(self.client, post_id)
+
+    def get_user_stats(self, user_id: str = None):
+        return supabase_config.get_user_stats(self.client, user_id)
+
+    def delete_all_data(self, progress=None):
+        return supabase_config.delete_all_data(self.client, progress=progress)
+
+class SQLiteBackend(StorageBackend):
+    """Local SQLite database for single-node deployments, development and load tests.
+
+    Reaction counts, stats and deletes run as direct SQL on the indexed
+    tables. Reads and writes go through the supabase_config functions over
+    `client`, a PostgREST-compatible view of the same database, so each
+    query and write has one implementation.
+    """
+
+    def __init__(self, path: str = SQLITE_DB_PATH, client: SQLiteClient = None):
+        self.client = client or SQLiteClient(path)
+        self.db = self.client.db
+        self.lock = self.client.lock
+
+    def _query(self, sql: str, params=()):
+        with self.lock:
+            return _rows(self.db.execute(sql, params))
+
+    def create_post(self, content: str, mood: str, user_id: str = None):
+        return supabase_config.create_post(self.client, content, mood, user_id)
+
+    def get_posts(self, limit: int = 50, sort: str = "latest", mood: str = None, before: tuple = None):
+        return supabase_config.get_posts(self.client, limit=limit, sort=sort, mood=mood, before=before)
+
+    def create_comment(self, post_id: str, content: str, user_id: str = None, ai_mode: str = None):
+        return supabase_config.create_comment(self.client, post_id, content, user_id, ai_mode=ai_mode)
+
+    def get_comments(self, post_id: str):
+        return supabase_config.get_comments(self.client, post_id)
+
+    def add_reaction(self, post_id: str, emoji: str, user_id: str = None):
+        return supabase_config.add_reaction(self.client, post_id, emoji, user_id)
+
+    @timed("sqlite.count_reactions")
+    def count_reactions(self, post_id: str):
+        try:
+            return self._query("SELECT emoji, COUNT(*) AS count FROM reactions WHERE post_id = ? GROUP BY emoji", (post_id,))
+        except sqlite3.Error as e:
+            report_error(f"Error counting reactions: {str(e)}")
+            return None
+
+    @timed("sqlite.get_user_stats")
+    def get_user_stats(self, user_id: str = None):
+        try:
+            with self.lock:
+                stats = self.client._rpc_get_app_stats()
+            moods = {mood: count for mood, count in stats["moods"].items() if count}
+            return {
+                "posts": stats["posts"],
+                "comments": stats["comments"],
+                "reactions": stats["reactions"],
+                "unique_moods": len(moods),
+                "moods": moods
+            }
+        except sqlite3.Error as e:
+            report_error(f"Error fetching stats: {str(e)}")
+            return {
+                "posts": 0,
+                "comments": 0,
+                "reactions": 0,
+                "unique_moods": 0,
+                "moods": {}
+            }
+
+    @timed("sqlite.delete_all_data", is_error=lambda result: not result[0])
+    def delete_all_data(self, progress=None):
+        try:
+            total = self._query("SELECT COUNT(*) AS count FROM posts")[0]["count"]
+            deleted = 0
+            while True:
+                # One short transaction per chunk; comments, reactions and jobs cascade
+                with self.lock:
+                    try:
+                        chunk = self.db.execute(
+                            "DELETE FROM posts WHERE id IN (SELECT id FROM posts ORDER BY created_at LIMIT ?)",
+                            (supabase_config.DELETE_CHUNK_SIZE,)
+                        ).rowcount
+                        self.db.commit()
+                    except Exception:
+                        self.db.rollback()
+                        raise
+                deleted += chunk
+                if progress:
+                    progress(deleted, max(total, deleted))
+                if chunk < supabase_config.DELETE_CHUNK_SIZE:
+                    break
+            return True, f"All data deleted successfully ({deleted:,} posts)"
+        except sqlite3.Error as e:
+            return False, f"Error deleting data: {str(e)}"
+
+@st.cache_resource(show_spinner=False)
+def _get_sqlite_backend(path: str):
+    """Open the SQLite database once per process"""
+    return SQLiteBackend(path)
+
+def get_storage_backend():
+    """Get the configured storage backend, or None if it can't be reached"""
+    if STORAGE_BACKEND == "sqlite":
+        return _get_sqlite_backend(SQLITE_DB_PATH)
+    client = supabase_config.init_supabase()
+    return SupabaseBackend(client) if client else None
@@ -1,13 +1,74 @@
 import os
+import re
+import time
 import uuid
+import logging
+import threading
 import streamlit as st
 from supabase import create_client, Client
 from dotenv import load_dotenv
+import metrics
+from metrics import timed
+from dedup import index_post_text
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+# How often a cached client is probed before being reused
+SUPABASE_HEALTH_CHECK_INTERVAL = float(os.getenv("SUPABASE_HEALTH_CHECK_INTERVAL", "60"))
+
+# How long aggregate stats are reused before being recounted
+STATS_CACHE_TTL = int(os.getenv("STATS_CACHE_TTL", "30"))
+
+# Quiet period before buffered reaction clicks are written
+REACTION_FLUSH_DELAY = float(os.getenv("REACTION_FLUSH_DELAY", "1.5"))
+
+# Rows removed per chunk by bulk deletes and the retention purge
+DELETE_CHUNK_SIZE = int(os.getenv("DELETE_CHUNK_SIZE", "1000"))
+# Post ids named in one DELETE request; they travel in the URL, so this
+# stays well under the gateway's URL length limit
+DELETE_IDS_PER_REQUEST = int(os.getenv("DELETE_IDS_PER_REQUEST", "100"))
+
+# Stored AI comments look like "🤖 AI (wise): reply"
+AI_COMMENT_RE = re.compile(r"^(?:🤖 )?AI \((\w+)\): (.*)$", re.DOTALL)
+
+MOODS = ["sad", "angry", "meh", "lol", "happy", "confused"]
+
+_last_health_check = {}
+
+def report_error(message: str):
+    """Show an error on the page and count it against the current call's metrics"""
+    st.error(message)
+    metrics.mark_error()
+
+def _client_is_healthy(client: Client):
+    """Cheap health check for a cached client, at most once per interval"""
+    now = time.monotonic()
+    if now - _last_health_check.get(id(client), 0) < SUPABASE_HEALTH_CHECK_INTERVAL:
+        return True
+    try:
+        client.table("posts").select("id").limit(1).execute()
+    except Exception:
+        _last_health_check.pop(id(client), None)
+        return False
+    _last_health_check[id(client)] = now
+    return True
+
+@st.cache_resource(show_spinner=False, validate=_client_is_healthy)
+def _get_client(url: str, key: str):
+    """Build the Supabase client once per process, shared by all sessions and pages"""
+    client = create_client(url, key)
+    _last_health_check[id(client)] = time.monotonic()
+    return client
+
 def init_supabase():
     """Initialize Supabase client"""
+    # A local SQLite database stands in for Supabase when configured
+    import storage
+    if storage.STORAGE_BACKEND == "sqlite":
+        return storage.get_storage_backend().client
+
     url = os.getenv("SUPABASE_URL") or st.secrets.get("SUPABASE_URL")
     key = os.getenv("SUPABASE_KEY") or st.secrets.get("SUPABASE_KEY")
     
@@ -15,8 +76,20 @@ def init_supabase():
         st.error("Supabase credentials not found! Please check your .env file or Streamlit secrets.")
         return None
     
-    return create_client(url, key)
+    return _get_client(url, key)
+
+def reset_supabase():
+    """Drop the cached client so the next init_supabase() builds a fresh one"""
+    _get_client.clear()
+    _last_health_check.clear()
+
+def get_anon_id():
+    """Get this session's anonymous ID, used to attribute posts, comments and reactions"""
+    if 'anon_id' not in st.session_state:
+        st.session_state.anon_id = str(uuid.uuid4())
+    return st.session_state.anon_id
 
+@timed("supabase.create_post")
 def create_post(supabase: Client, content: str, mood: str, user_id: str = None):
     """Create a new post"""
     try:
@@ -26,79 +99,265 @@ def create_post(supabase: Client, content: str, mood: str, user_id: str = None):
             "user_id": user_id
         }
         result = supabase.table("posts").insert(data).execute()
+        if result.data:
+            # Lets later near-identical confessions reuse this post's AI reply
+            index_post_text(content)
         return result.data[0] if result.data else None
     except Exception as e:
-        st.error(f"Error creating post: {str(e)}")
+        report_error(f"Error creating post: {str(e)}")
         return None
 
-def get_posts(supabase: Client, limit: int = 50):
-    """Get all posts ordered by creation time"""
+# Sort modes for get_posts: (table or view, ranking column)
+POST_SORTS = {
+    "latest": ("posts", None),
+    "most_commented": ("posts_with_stats", "comment_count"),
+    "most_reacted": ("posts_with_stats", "reaction_count"),
+}
+
+def _keyset_filter(columns: list, values: tuple):
+    """Build a PostgREST `or` filter selecting rows after a cursor on descending columns"""
+    clauses = []
+    for i, column in enumerate(columns):
+        conditions = [f'{c}.eq."{v}"' for c, v in zip(columns[:i], values[:i])]
+        conditions.append(f'{column}.lt."{values[i]}"')
+        clauses.append(conditions[0] if len(conditions) == 1 else f"and({','.join(conditions)})")
+    return ",".join(clauses)
+
+@timed("supabase.get_posts_page")
+def get_posts_page(supabase: Client, limit: int = 50, sort: str = "latest", mood: str = None, before: tuple = None):
+    """Get one page of posts plus a cursor for the next page.
+
+    Filtering and ranking happen in the database. Pass the returned cursor
+    back as `before` to continue after the last post; it is None once there
+    are no more posts.
+    """
     try:
-        result = supabase.table("posts").select("*").order("created_at", desc=True).limit(limit).execute()
-        return result.data
+        table, rank_column = POST_SORTS.get(sort, POST_SORTS["latest"])
+        order_columns = ([rank_column] if rank_column else []) + ["created_at", "id"]
+
+        query = supabase.table(table).select("*")
+        if mood:
+            query = query.eq("mood", mood)
+        if before:
+            # The plain bound lets the index seek to the cursor; the `or`
+            # filter then drops ties already shown
+            query = query.lte(order_columns[0], before[0]).or_(_keyset_filter(order_columns, before))
+        for column in order_columns:
+            query = query.order(column, desc=True)
+
+        # Ask for one extra row to learn whether another page exists
+        result = query.limit(limit + 1).execute()
+        posts = result.data or []
+        if len(posts) > limit:
+            posts = posts[:limit]
+            next_cursor = tuple(posts[-1][column] for column in order_columns)
+        else:
+            next_cursor = None
+        return posts, next_cursor
+    except Exception as e:
+        report_error(f"Error fetching posts: {str(e)}")
+        return [], None
+
+@timed("supabase.get_posts_since")
+def get_posts_since(supabase: Client, since: str, mood: str = None, limit: int = 100):
+    """Get posts created at or after a timestamp, newest first"""
+    try:
+        query = supabase.table("posts").select("*").gte("created_at", since)
+        if mood:
+            query = query.eq("mood", mood)
+        result = query.order("created_at", desc=True).order("id", desc=True).limit(limit).execute()
+        return result.data or []
     except Exception as e:
-        st.error(f"Error fetching posts: {str(e)}")
+        report_error(f"Error fetching new posts: {str(e)}")
         return []
 
-def create_comment(supabase: Client, post_id: str, content: str, user_id: str = None):
-    """Create a comment on a post"""
+@timed("supabase.get_posts")
+def get_posts(supabase: Client, limit: int = 50, sort: str = "latest", mood: str = None, before: tuple = None):
+    """Get posts ranked on the database side, newest first by default"""
+    posts, _ = get_posts_page(supabase, limit=limit, sort=sort, mood=mood, before=before)
+    return posts
+
+@timed("supabase.search_posts")
+def search_posts(supabase: Client, query: str, mood: str = None, limit: int = 20, cursor: tuple = None):
+    """Full-text search over posts, best matches first.
+
+    Runs as one indexed query through the search_posts() RPC. Returns a page
+    of posts (with their stats and a `rank`) plus a cursor for the next page,
+    None once there are no more matches.
+    """
+    if not query or not query.strip():
+        return [], None
     try:
-        # Generate a valid UUID for AI bot if user_id is 'ai_bot'
-        if user_id == "ai_bot":
-            user_id = str(uuid.uuid4())
+        params = {"search_query": query, "mood_filter": mood, "result_limit": limit + 1}
+        if cursor:
+            params.update(zip(("after_rank", "after_created_at", "after_id"), cursor))
+        result = supabase.rpc("search_posts", params).execute()
+        posts = result.data or []
+        if len(posts) > limit:
+            posts = posts[:limit]
+            next_cursor = (posts[-1]["rank"], posts[-1]["created_at"], posts[-1]["id"])
+        else:
+            next_cursor = None
+        return posts, next_cursor
+    except Exception as e:
+        report_error(f"Error searching posts: {str(e)}")
+        return [], None
 
+@timed("supabase.create_comment")
+def create_comment(supabase: Client, post_id: str, content: str, user_id: str = None, ai_mode: str = None):
+    """Create a comment on a post"""
+    try:
         data = {
             "post_id": post_id,
             "content": content,
             "user_id": user_id
         }
+
+        # AI replies are flagged so the feed can reuse them instead of regenerating
+        if user_id == "ai_bot":
+            # Generate a valid UUID for AI bot since user_id is a uuid column
+            data["user_id"] = str(uuid.uuid4())
+            data["is_ai"] = True
+            data["ai_mode"] = ai_mode
+
         result = supabase.table("comments").insert(data).execute()
         return result.data[0] if result.data else None
     except Exception as e:
-        st.error(f"Error creating comment: {str(e)}")
+        report_error(f"Error creating comment: {str(e)}")
         return None
 
+def create_ai_comment(supabase: Client, post_id: str, reply: str, mode: str):
+    """Store an AI reply as a post's AI comment"""
+    return create_comment(supabase, post_id, f"🤖 AI ({mode}): {reply}", "ai_bot", ai_mode=mode)
+
+def parse_ai_comment(comment: dict):
+    """Turn a stored AI comment back into {'response', 'mode'}"""
+    match = AI_COMMENT_RE.match(comment["content"])
+    if match:
+        return {"response": match.group(2), "mode": comment.get("ai_mode") or match.group(1)}
+    return {"response": comment["content"], "mode": comment.get("ai_mode") or "wise"}
+
+@timed("supabase.get_ai_replies_for_posts")
+def get_ai_replies_for_posts(supabase: Client, post_ids: list):
+    """Get the stored AI reply for many posts in one query, keyed by post id"""
+    replies = {}
+    if not post_ids:
+        return replies
+    try:
+        result = supabase.table("comments").select("post_id, content, ai_mode").in_("post_id", list(post_ids)).eq("is_ai", True).order("created_at", desc=False).execute()
+        # The first AI comment on a post is its reply
+        for comment in result.data or []:
+            if comment["post_id"] not in replies:
+                replies[comment["post_id"]] = parse_ai_comment(comment)
+        return replies
+    except Exception as e:
+        report_error(f"Error fetching AI replies: {str(e)}")
+        return replies
+
+@timed("supabase.get_comments")
 def get_comments(supabase: Client, post_id: str):
     """Get comments for a specific post"""
     try:
         result = supabase.table("comments").select("*").eq("post_id", post_id).order("created_at", desc=False).execute()
         return result.data
     except Exception as e:
-        st.error(f"Error fetching comments: {str(e)}")
+        report_error(f"Error fetching comments: {str(e)}")
         return []
 
+@timed("supabase.get_comments_for_posts")
+def get_comments_for_posts(supabase: Client, post_ids: list, chunk_size: int = 100):
+    """Get comments for many posts at once, grouped by post id"""
+    comments_by_post = {post_id: [] for post_id in post_ids}
+    try:
+        # One `in` query per chunk keeps the request URL a sane length
+        for i in range(0, len(post_ids), chunk_size):
+            chunk = post_ids[i:i + chunk_size]
+            result = supabase.table("comments").select("*").in_("post_id", chunk).order("created_at", desc=False).execute()
+            for comment in result.data or []:
+                comments_by_post.setdefault(comment["post_id"], []).append(comment)
+        return comments_by_post
+    except Exception as e:
+        report_error(f"Error fetching comments: {str(e)}")
+        return comments_by_post
+
+@timed("supabase.add_reaction")
 def add_reaction(supabase: Client, post_id: str, emoji: str, user_id: str = None):
-    """Add a reaction to a post"""
-    try:
-        # Check if user already reacted
-        existing = supabase.table("reactions").select("*").eq("post_id", post_id).eq("user_id", user_id or "anon").execute()
-        
-        if existing.data:
-            # Update existing reaction
-            result = supabase.table("reactions").update({"emoji": emoji}).eq("id", existing.data[0]["id"]).execute()
-        else:
-            # Create new reaction
-            data = {
-                "post_id": post_id,
-                "emoji": emoji,
-                "user_id": user_id or "anon"
-            }
-            result = supabase.table("reactions").insert(data).execute()
-        
+    """Add a reaction to a post, replacing any earlier reaction by the same user"""
+    try:
+        data = {
+            "post_id": post_id,
+            "emoji": emoji,
+            "user_id": user_id or "anon"
+        }
+        # One atomic upsert on UNIQUE(post_id, user_id)
+        result = supabase.table("reactions").upsert(data, on_conflict="post_id,user_id").execute()
         return result.data[0] if result.data else None
     except Exception as e:
-        st.error(f"Error adding reaction: {str(e)}")
+        report_error(f"Error adding reaction: {str(e)}")
         return None
 
+class ReactionBuffer:
+    """Per-session write buffer for reactions.
+
+    Rapid clicks on the same post overwrite each other in memory, and only
+    the final emoji per post is written once clicks have been quiet for
+    `delay` seconds. Everything pending is flushed in a single upsert.
+    """
+
+    def __init__(self, supabase: Client, delay: float = REACTION_FLUSH_DELAY):
+        self.supabase = supabase
+        self.delay = delay
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._timer = None
+
+    def add(self, post_id: str, emoji: str, user_id: str = None):
+        """Queue a reaction, restarting the flush timer"""
+        with self._lock:
+            self._pending[(post_id, user_id or "anon")] = emoji
+            if self._timer:
+                self._timer.cancel()
+            self._timer = threading.Timer(self.delay, self.flush)
+            self._timer.start()
+
+    def flush(self):
+        """Write all pending reactions now"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            if self._timer:
+                self._timer.cancel()
+                self._timer = None
+        if not pending:
+            return
+
+        rows = [
+            {"post_id": post_id, "user_id": user_id, "emoji": emoji}
+            for (post_id, user_id), emoji in pending.items()
+        ]
+        try:
+            with metrics.timer("supabase.flush_reactions"):
+                self.supabase.table("reactions").upsert(rows, on_conflict="post_id,user_id").execute()
+        except Exception:
+            # Runs off the script thread, so there is no page to show an error on
+            logger.exception("Error flushing %d buffered reactions", len(rows))
+
+def get_reaction_buffer(supabase: Client):
+    """Get this session's reaction buffer"""
+    if "reaction_buffer" not in st.session_state:
+        st.session_state.reaction_buffer = ReactionBuffer(supabase)
+    return st.session_state.reaction_buffer
+
+@timed("supabase.get_reactions")
 def get_reactions(supabase: Client, post_id: str):
     """Get reactions for a specific post"""
     try:
         result = supabase.table("reactions").select("*").eq("post_id", post_id).execute()
         return result.data
     except Exception as e:
-        st.error(f"Error fetching reactions: {str(e)}")
+        report_error(f"Error fetching reactions: {str(e)}")
         return []
 
+@timed("supabase.count_reactions")
 def count_reactions(supabase: Client, post_id: str):
     """Count reactions for a specific post"""
     try:
@@ -111,52 +370,140 @@ def count_reactions(supabase: Client, post_id: str):
             return [{"emoji": emoji, "count": count} for emoji, count in counts.items()]
         return []
     except Exception as e:
-        st.error(f"Error counting reactions: {str(e)}")
+        report_error(f"Error counting reactions: {str(e)}")
         return None
 
-def delete_all_data(supabase: Client):
-    """Delete all posts, comments, and reactions from the database"""
+@timed("supabase.count_reactions_for_posts")
+def count_reactions_for_posts(supabase: Client, post_ids: list):
+    """Count reactions for many posts in one round trip, grouped by post id"""
+    counts_by_post = {post_id: [] for post_id in post_ids}
+    if not post_ids:
+        return counts_by_post
+    try:
+        result = supabase.rpc("reaction_counts", {"post_ids": list(post_ids)}).execute()
+        for row in result.data or []:
+            counts_by_post.setdefault(row["post_id"], []).append({"emoji": row["emoji"], "count": row["count"]})
+        return counts_by_post
+    except Exception as e:
+        report_error(f"Error counting reactions: {str(e)}")
+        return counts_by_post
+
+def delete_posts_in_chunks(supabase: Client, before: str = None, chunk_size: int = DELETE_CHUNK_SIZE, progress=None):
+    """Delete posts oldest first, `chunk_size` at a time.
+
+    Each chunk's ids are deleted DELETE_IDS_PER_REQUEST per statement.
+    Comments, reactions and AI reply jobs go with their posts (ON DELETE
+    CASCADE), so each statement stays small and short-lived instead of one
+    table-wide delete holding locks. `before` limits deletion to posts created
+    before that ISO timestamp. `progress(deleted, total)` is called after each
+    chunk. Returns the number of posts deleted.
+    """
+    count_query = supabase.table("posts").select("id", count="exact", head=True)
+    if before:
+        count_query = count_query.lt("created_at", before)
+    total = count_query.execute().count or 0
+
+    deleted = 0
+    while True:
+        # Delete by id so a chunk is exactly chunk_size posts, however many
+        # share the oldest timestamps
+        id_query = supabase.table("posts").select("id")
+        if before:
+            id_query = id_query.lt("created_at", before)
+        ids = [row["id"] for row in id_query.order("created_at").order("id").limit(chunk_size).execute().data or []]
+        # One `in` list per request keeps the DELETE URL a sane length
+        for i in range(0, len(ids), DELETE_IDS_PER_REQUEST):
+            batch = ids[i:i + DELETE_IDS_PER_REQUEST]
+            deleted += supabase.table("posts").delete(count="exact", returning="minimal").in_("id", batch).execute().count or 0
+
+        if progress:
+            progress(deleted, max(total, deleted))
+        if len(ids) < chunk_size:
+            break
+
+    _fetch_stats.clear()
+    return deleted
+
+@timed("supabase.delete_all_data", is_error=lambda result: not result[0])
+def delete_all_data(supabase: Client, progress=None):
+    """Delete all posts, comments, and reactions from the database, in chunks"""
     try:
-        # Delete all records with proper WHERE clauses
-        supabase.table("reactions").delete().neq('id', '00000000-0000-0000-0000-000000000000').execute()
-        supabase.table("comments").delete().neq('id', '00000000-0000-0000-0000-000000000000').execute()
-        supabase.table("posts").delete().neq('id', '00000000-0000-0000-0000-000000000000').execute()
-        return True, "All data deleted successfully"
+        deleted = delete_posts_in_chunks(supabase, progress=progress)
+        return True, f"All data deleted successfully ({deleted:,} posts)"
     except Exception as e:
         return False, f"Error deleting data: {str(e)}"
 
-def get_user_stats(supabase: Client, user_id: str = None):
-    """Get user statistics"""
+@timed("supabase.get_user_profile")
+def get_user_profile(supabase: Client, anonymous_id: str):
+    """Get one user's counters, kept up to date by database triggers"""
+    profile = {
+        "posts": 0,
+        "comments": 0,
+        "reactions": 0,
+        "unique_moods": 0,
+        "moods": {},
+        "favorite_mood": None
+    }
     try:
-        # Get post count
-        posts = supabase.table("posts").select("id").execute()
-        post_count = len(posts.data) if posts.data else 0
+        result = supabase.table("user_profiles").select("*").eq("anonymous_id", anonymous_id).limit(1).execute()
+        if result.data:
+            row = result.data[0]
+            moods = {mood: count for mood, count in (row.get("mood_counts") or {}).items() if count}
+            profile.update({
+                "posts": row["total_posts"],
+                "comments": row["total_comments"],
+                "reactions": row["total_reactions"],
+                "unique_moods": len(moods),
+                "moods": moods,
+                "favorite_mood": row["favorite_mood"] if moods else None
+            })
+        return profile
+    except Exception as e:
+        report_error(f"Error fetching profile: {str(e)}")
+        return profile
 
-        # Get comment count
-        comments = supabase.table("comments").select("id").execute()
-        comment_count = len(comments.data) if comments.data else 0
+@st.cache_data(ttl=STATS_CACHE_TTL, show_spinner=False)
+def _fetch_stats(_supabase: Client, user_id: str = None):
+    """Fetch aggregate counts; constant-size payload whatever the table sizes"""
+    try:
+        # Single round trip when the get_app_stats() RPC is installed
+        result = _supabase.rpc("get_app_stats").execute()
+        stats = result.data
+    except Exception:
+        # Fall back to exact-count HEAD requests, which transfer no rows
+        def exact_count(table, **filters):
+            query = _supabase.table(table).select("id", count="exact", head=True)
+            for column, value in filters.items():
+                query = query.eq(column, value)
+            return query.execute().count or 0
 
-        # Get reaction count
-        reactions = supabase.table("reactions").select("id").execute()
-        reaction_count = len(reactions.data) if reactions.data else 0
+        stats = {
+            "posts": exact_count("posts"),
+            "comments": exact_count("comments"),
+            "reactions": exact_count("reactions"),
+            "moods": {mood: exact_count("posts", mood=mood) for mood in MOODS}
+        }
 
-        # Get unique moods
-        if posts.data:
-            unique_moods = len(set(post['mood'] for post in posts.data if 'mood' in post))
-        else:
-            unique_moods = 0
+    moods = {mood: count for mood, count in (stats.get("moods") or {}).items() if count}
+    return {
+        "posts": stats.get("posts") or 0,
+        "comments": stats.get("comments") or 0,
+        "reactions": stats.get("reactions") or 0,
+        "unique_moods": len(moods),
+        "moods": moods
+    }
 
-        return {
-            "posts": post_count,
-            "comments": comment_count,
-            "reactions": reaction_count,
-            "unique_moods": unique_moods
-        }
+@timed("supabase.get_user_stats")
+def get_user_stats(supabase: Client, user_id: str = None):
+    """Get user statistics"""
+    try:
+        return _fetch_stats(supabase, user_id)
     except Exception as e:
-        st.error(f"Error fetching stats: {str(e)}")
+        report_error(f"Error fetching stats: {str(e)}")
         return {
             "posts": 0,
             "comments": 0,
             "reactions": 0,
-            "unique_moods": 0
+            "unique_moods": 0,
+            "moods": {}
         }
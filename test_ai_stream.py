@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+Test streamed AI replies against the local OpenRouter stub (runs offline)
+"""
+
+import os
+import sys
+import tempfile
+
+# Add current directory and the benchmark stand-ins to path
+sys.path.append('.')
+sys.path.append('benchmarks')
+
+from stub_openrouter import StubOpenRouter
+
+REPLY = "Café vibes 🥣, naïve but brave — ¡ánimo!"
+
+# Point the AI layer at the stub before it is imported; the stub's thread
+# is a daemon and goes away with the test process
+STUB = StubOpenRouter(latency=0, reply=REPLY).start()
+os.environ["OPENROUTER_URL"] = STUB.url
+os.environ["OPENROUTER_API_KEY"] = "test"
+os.environ["AI_REPLY_CACHE_PATH"] = os.path.join(tempfile.mkdtemp(), "replies.sqlite3")
+os.environ["DEDUP_ENABLED"] = "0"
+
+from ai_utils import stream_ai_reply, get_ai_reply
+
+def test_stream_keeps_utf8():
+    """Accents and emoji survive streaming and the reply cache"""
+    streamed = "".join(stream_ai_reply("I eat cereal for dinner and I'm not sorry about it", "funny")).strip()
+    assert streamed == REPLY, streamed
+
+    # Served from the cache, which must hold the same text
+    requests = STUB.requests
+    assert get_ai_reply("I eat cereal for dinner and I'm not sorry about it", "funny") == REPLY
+    assert STUB.requests == requests
+
+def test_reply_keeps_utf8():
+    """Non-streamed replies decode the same way"""
+    assert get_ai_reply("Sometimes I pretend to understand meetings", "wise") == REPLY
+
+if __name__ == "__main__":
+    test_stream_keeps_utf8()
+    test_reply_keeps_utf8()
+    print("✅ AI streaming tests passed!")
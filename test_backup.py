@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Test backup export and import against the in-memory database (runs offline)
+"""
+
+import os
+import sys
+import tempfile
+
+# Add current directory and the benchmark stand-ins to path
+sys.path.append('.')
+sys.path.append('benchmarks')
+
+from fake_supabase import FakeSupabase, seed
+from backup import BACKUP_TABLES, export_data, import_data
+
+def table_rows(client, table):
+    columns = BACKUP_TABLES[table]
+    rows = client.table(table).select(",".join(columns)).order("id").execute().data
+    return [{column: row[column] for column in columns} for row in rows]
+
+def round_trip(fmt: str):
+    """Export a seeded database, import it into an empty one, then import again"""
+    source = seed(FakeSupabase(), 300)
+    directory = tempfile.mkdtemp()
+    # Comments and reactions share their post's created_at, so small pages
+    # cut through runs of tied timestamps
+    exported = export_data(source, directory, fmt=fmt, page_size=37)
+    assert sorted(os.listdir(directory)) == sorted(f"{table}.{fmt}" for table in BACKUP_TABLES)
+    for table in BACKUP_TABLES:
+        assert exported[table] == len(table_rows(source, table)) > 0
+
+    target = FakeSupabase()
+    assert import_data(target, directory, batch_size=50) == exported
+    for table in BACKUP_TABLES:
+        assert table_rows(target, table) == table_rows(source, table), table
+
+    # A second run finds every row already there
+    assert import_data(target, directory, batch_size=50) == {table: 0 for table in BACKUP_TABLES}
+    for table in BACKUP_TABLES:
+        assert len(table_rows(target, table)) == exported[table]
+
+def test_ndjson_round_trip():
+    """NDJSON exports import back exactly, and re-imports add nothing"""
+    round_trip("ndjson")
+
+def test_parquet_round_trip():
+    """Same for Parquet, when pyarrow is installed"""
+    try:
+        import pyarrow
+    except ImportError:
+        return
+    round_trip("parquet")
+
+if __name__ == "__main__":
+    test_ndjson_round_trip()
+    test_parquet_round_trip()
+    print("✅ Backup tests passed!")
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Test near-duplicate detection (runs offline)
+"""
+
+import os
+import sys
+import sqlite3
+import tempfile
+from unittest.mock import patch
+
+# Add current directory to path
+sys.path.append('.')
+
+import dedup
+from dedup import NearDuplicateIndex, simhash, hamming_distance
+from reply_cache import ReplyCache, text_hash
+
+CEREAL = "I eat cereal for dinner more often than actual meals and I'm not even sorry about it"
+MEETINGS = "Sometimes I pretend to understand what people are talking about in meetings when I have absolutely no clue"
+
+def new_index(**kwargs):
+    return NearDuplicateIndex(os.path.join(tempfile.mkdtemp(), "replies.sqlite3"), **kwargs)
+
+def test_simhash_ignores_case_and_punctuation():
+    """Trivial edits give the same fingerprint, different texts don't"""
+    assert simhash(CEREAL) == simhash("i eat cereal for dinner more often than actual meals and im not even sorry about it!!")
+    assert hamming_distance(simhash(CEREAL), simhash(MEETINGS)) > 10
+
+def test_find_similar():
+    """Lightly edited reposts find the original, unrelated and short texts don't"""
+    index = new_index()
+    assert index.add(CEREAL)
+    assert index.add(MEETINGS)
+    assert not index.add("so tired")
+
+    matches = index.find_similar("I eat cereal for dinner more often than actual meals and I'm not even sorry about it honestly")
+    assert [key for key, _ in matches] == [text_hash(CEREAL)]
+    assert index.find_similar("My cat knocked every plant off the shelf again this morning and I let her") == []
+    assert index.find_similar("so tired") == []
+    # A text never matches itself
+    assert index.find_similar(CEREAL) == []
+
+def test_swapped_words_dont_match():
+    """Close fingerprints with a swapped word, say hate for love, are not duplicates"""
+    pairs = [
+        ("I secretly hate my job but nobody at the office knows after six years of coffee and spreadsheets",
+         "I secretly love my job but nobody at the office knows after six years of coffee and spreadsheets"),
+        ("Watching my little brother graduate today after everything he went through this year makes me furious",
+         "Watching my little brother graduate today after everything he went through this year makes me happy"),
+    ]
+    for original, swapped in pairs:
+        # Within the fingerprint distance, so only the word check tells them apart
+        assert hamming_distance(simhash(original), simhash(swapped)) <= 4
+        index = new_index()
+        index.add(original)
+        assert index.find_similar(swapped) == []
+
+def test_old_index_without_words():
+    """Indexes from before words were stored open fine and never confirm old rows"""
+    path = os.path.join(tempfile.mkdtemp(), "replies.sqlite3")
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE post_simhashes (text_hash TEXT PRIMARY KEY, simhash INTEGER NOT NULL, "
+        + ", ".join(f"band{i} INTEGER NOT NULL" for i in range(5)) + ", created_at REAL NOT NULL)"
+    )
+    conn.commit()
+    conn.close()
+
+    index = NearDuplicateIndex(path)
+    assert index.add(CEREAL)
+    assert index.find_similar(CEREAL + " honestly")
+
+def test_reply_reuse_by_hash():
+    """A match's text hash looks up the reply cached for the earlier post, per mode"""
+    path = os.path.join(tempfile.mkdtemp(), "replies.sqlite3")
+    cache, index = ReplyCache(path), NearDuplicateIndex(path)
+    cache.set(CEREAL, "funny", "model", "Breakfast for rebels.")
+    index.add(CEREAL)
+
+    key, _ = index.find_similar(CEREAL + " honestly")[0]
+    assert cache.get_by_hash(key, "funny", "model") == "Breakfast for rebels."
+    assert cache.get_by_hash(key, "wise", "model") is None
+
+def test_reply_reuse_keeps_hit_rate():
+    """Probing near-duplicate candidates doesn't count as cache misses"""
+    path = os.path.join(tempfile.mkdtemp(), "replies.sqlite3")
+    cache, index = ReplyCache(path), NearDuplicateIndex(path)
+    for suffix in ("", " honestly", " really"):
+        index.add(CEREAL + suffix)
+    cache.set(CEREAL + " really", "funny", "model", "Breakfast for rebels.")
+
+    with patch.object(dedup, "DEDUP_ENABLED", True), \
+         patch.object(dedup, "get_reply_cache", return_value=cache), \
+         patch.object(dedup, "get_dedup_index", return_value=index):
+        assert dedup.find_similar_reply(CEREAL, "funny", "model") == "Breakfast for rebels."
+        assert dedup.find_similar_reply(CEREAL, "wise", "model") is None
+    assert cache.stats()["hits"] == 0 and cache.stats()["misses"] == 0
+
+def test_eviction():
+    """The index keeps at most max_entries texts"""
+    index = new_index(max_entries=1)
+    index.add(CEREAL)
+    index.add(MEETINGS)
+    assert index.find_similar(CEREAL + " honestly") == []
+    assert index.find_similar(MEETINGS + " honestly")
+
+if __name__ == "__main__":
+    test_simhash_ignores_case_and_punctuation()
+    test_find_similar()
+    test_swapped_words_dont_match()
+    test_old_index_without_words()
+    test_reply_reuse_by_hash()
+    test_reply_reuse_keeps_hit_rate()
+    test_eviction()
+    print("✅ Dedup tests passed!")
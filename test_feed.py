@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Test feed refreshes against the in-memory database (runs offline)
+"""
+
+import sys
+import uuid
+from datetime import datetime, timedelta, timezone
+import streamlit as st
+
+# Add current directory and the benchmark stand-ins to path
+sys.path.append('.')
+sys.path.append('benchmarks')
+
+from fake_supabase import FakeSupabase
+from feed_state import load_feed, refresh_feed
+
+START = datetime(2026, 10, 1, tzinfo=timezone.utc)
+
+def add_post(client, minute: int, mood: str = "sad"):
+    created = (START + timedelta(minutes=minute)).isoformat()
+    post_id = str(uuid.uuid4())
+    client.table("posts").insert({
+        "id": post_id, "content": f"confession at {minute}", "mood": mood,
+        "created_at": created, "updated_at": created
+    }).execute()
+    return post_id
+
+def feed_ids(key):
+    return [post["id"] for post in st.session_state[key]["posts"]]
+
+def test_refresh_merges_new_posts():
+    """New posts go on top; posts sharing the newest timestamp aren't shown twice"""
+    client = FakeSupabase()
+    old = [add_post(client, minute) for minute in range(5)]
+    load_feed(client, "feed", page_size=3)
+    assert feed_ids("feed") == [old[4], old[3], old[2]]
+
+    # Same timestamp as the newest loaded post, then a newer one
+    tied = add_post(client, 4)
+    newer = add_post(client, 10)
+    refresh_feed(client, "feed")
+    ids = feed_ids("feed")
+    assert ids[0] == newer
+    assert sorted(ids[1:3]) == sorted([tied, old[4]])
+    assert ids[3:] == [old[3], old[2]]
+    assert len(ids) == len(set(ids))
+    assert st.session_state["feed"]["newest"] == (START + timedelta(minutes=10)).isoformat()
+
+    # Nothing new, nothing changes
+    refresh_feed(client, "feed")
+    assert feed_ids("feed") == ids
+
+def test_refresh_keeps_mood_filter():
+    """A mood feed only pulls in posts of that mood"""
+    client = FakeSupabase()
+    add_post(client, 0, "sad")
+    load_feed(client, "mood_feed", page_size=10, mood="sad")
+    happy = add_post(client, 1, "happy")
+    sad = add_post(client, 2, "sad")
+    refresh_feed(client, "mood_feed")
+    ids = feed_ids("mood_feed")
+    assert ids[0] == sad and happy not in ids
+
+def test_refresh_starts_over():
+    """Ranked feeds, searches and feeds too far behind reset instead of patching"""
+    client = FakeSupabase()
+    add_post(client, 0)
+    load_feed(client, "ranked", page_size=10, sort="most_reacted")
+    refresh_feed(client, "ranked")
+    assert "ranked" not in st.session_state
+
+    load_feed(client, "behind", page_size=10)
+    for minute in range(1, 4):
+        add_post(client, minute)
+    refresh_feed(client, "behind", max_new=3)
+    assert "behind" not in st.session_state
+
+    # Refreshing a feed that was never loaded does nothing
+    refresh_feed(client, "missing")
+    assert "missing" not in st.session_state
+
+if __name__ == "__main__":
+    test_refresh_merges_new_posts()
+    test_refresh_keeps_mood_filter()
+    test_refresh_starts_over()
+    print("✅ Feed tests passed!")
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Test content moderation (runs offline)
+"""
+
+import sys
+
+# Add current directory to path
+sys.path.append('.')
+
+from moderation import Moderator, moderate_many
+
+def test_whole_word_matching():
+    """Banned words only match whole words"""
+    moderator = Moderator(["die", "kill"])
+    assert moderator.find("I'm on a diet and skills matter") == []
+    assert [m["term"] for m in moderator.find("Don't DIE on me")] == ["die"]
+
+def test_quotes_and_apostrophes():
+    """Quotes and apostrophes around or inside a word don't hide it"""
+    moderator = Moderator(["hate", "kill", "shut up"])
+    for text, term in [
+        ("I 'hate' this", "hate"),
+        ("'kill'", "kill"),
+        ("kill'em all", "kill"),
+        ("hate's a strong word", "hate"),
+        ("shut up'", "shut up")
+    ]:
+        assert [m["term"] for m in moderator.find(text)] == [term], text
+
+def test_default_terms():
+    """The shipped list keeps the original terms only"""
+    results = moderate_many(["I'm dying laughing", "I hated that movie", "I want to die"])
+    assert [r[0] for r in results] == [True, True, False]
+
+def test_match_positions_and_phrases():
+    """Matches report the term and where it is, including multi-word phrases"""
+    text = "they said shut up and left"
+    matches = Moderator(["shut up"]).find(text)
+    assert matches == [{"term": "shut up", "start": 10, "end": 17}]
+    assert text[matches[0]["start"]:matches[0]["end"]] == "shut up"
+
+def test_moderate_many():
+    """Batch moderation returns one result per text"""
+    results = moderate_many(["I hate mondays", "I love pizza", "hi", "x" * 2001])
+    assert [r[0] for r in results] == [False, True, False, False]
+    assert results[0][2][0]["term"] == "hate"
+
+if __name__ == "__main__":
+    test_whole_word_matching()
+    test_quotes_and_apostrophes()
+    test_default_terms()
+    test_match_positions_and_phrases()
+    test_moderate_many()
+    print("✅ Moderation tests passed!")
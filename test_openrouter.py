@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Test OpenRouter retries, Retry-After handling and the circuit breaker (runs offline)
+"""
+
+import sys
+import time
+from email.utils import formatdate
+from unittest.mock import Mock, patch
+import requests
+
+# Add current directory to path
+sys.path.append('.')
+
+from ai_utils import OpenRouterClient, OpenRouterError, CircuitOpenError
+
+def response(status: int, retry_after: str = None):
+    return Mock(status_code=status, headers={"Retry-After": retry_after} if retry_after else {})
+
+def new_client(*responses, **kwargs):
+    """A client whose session answers with `responses` in order"""
+    client = OpenRouterClient("test", **kwargs)
+    client.session = Mock()
+    client.session.post.side_effect = list(responses)
+    return client
+
+def test_retries_transient_errors():
+    """5xx and dropped connections are retried with bounded backoff"""
+    client = new_client(response(500), requests.ConnectionError("reset"), response(502), response(200))
+    with patch("ai_utils.time.sleep") as sleep:
+        assert client.chat({}).status_code == 200
+    assert client.session.post.call_count == 4
+    delays = [call.args[0] for call in sleep.call_args_list]
+    assert len(delays) == 3
+    assert all(0 <= delay <= min(client.backoff_max, client.backoff_base * 2 ** i) for i, delay in enumerate(delays))
+
+def test_gives_up_after_max_retries():
+    """The last error is raised once retries run out"""
+    client = new_client(*[response(503)] * 3, max_retries=2)
+    with patch("ai_utils.time.sleep"):
+        try:
+            client.chat({})
+        except OpenRouterError as e:
+            assert e.status_code == 503
+        else:
+            raise AssertionError("no error raised")
+    assert client.session.post.call_count == 3
+
+def test_client_errors_are_not_retried():
+    """A 400 fails at once and doesn't count against the circuit"""
+    client = new_client(response(400), failure_threshold=1)
+    with patch("ai_utils.time.sleep") as sleep:
+        try:
+            client.chat({})
+        except OpenRouterError as e:
+            assert e.status_code == 400
+        else:
+            raise AssertionError("no error raised")
+    assert client.session.post.call_count == 1
+    assert not sleep.called
+    client._before_call()
+
+def test_retry_after():
+    """Retry-After is followed in seconds or as a date, and too long a wait fails fast"""
+    client = new_client(response(429, "2"), response(200))
+    with patch("ai_utils.time.sleep") as sleep:
+        client.chat({})
+    sleep.assert_called_once_with(2.0)
+
+    client = new_client(response(503, formatdate(time.time() + 4, usegmt=True)), response(200))
+    with patch("ai_utils.time.sleep") as sleep:
+        client.chat({})
+    assert 2 < sleep.call_args.args[0] <= 4
+
+    client = new_client(response(429, "60"), response(200))
+    with patch("ai_utils.time.sleep") as sleep:
+        try:
+            client.chat({})
+        except OpenRouterError as e:
+            assert e.status_code == 429
+        else:
+            raise AssertionError("no error raised")
+    assert client.session.post.call_count == 1
+    assert not sleep.called
+
+def test_circuit_breaker():
+    """Repeated failures open the circuit; one trial call closes it again"""
+    client = new_client(response(500), response(500), max_retries=0, failure_threshold=2, reset_timeout=0.1)
+    for _ in range(2):
+        try:
+            client.chat({})
+        except CircuitOpenError:
+            raise AssertionError("circuit opened early")
+        except OpenRouterError:
+            pass
+
+    # Open: calls fail fast without touching the network
+    try:
+        client.chat({})
+    except CircuitOpenError:
+        pass
+    else:
+        raise AssertionError("circuit did not open")
+    assert client.session.post.call_count == 2
+
+    # After the cooldown a single trial goes through; others still fail fast meanwhile
+    time.sleep(0.15)
+    def trial(*args, **kwargs):
+        try:
+            client.chat({})
+        except CircuitOpenError:
+            return response(200)
+        raise AssertionError("second call went through during the trial")
+    client.session.post.side_effect = trial
+    assert client.chat({}).status_code == 200
+
+    # Closed again
+    client.session.post.side_effect = [response(200)]
+    assert client.chat({}).status_code == 200
+
+if __name__ == "__main__":
+    test_retries_transient_errors()
+    test_gives_up_after_max_retries()
+    test_client_errors_are_not_retried()
+    test_retry_after()
+    test_circuit_breaker()
+    print("✅ OpenRouter client tests passed!")
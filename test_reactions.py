@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Test buffered reaction writes against the in-memory database (runs offline)
+"""
+
+import sys
+import time
+from unittest.mock import patch
+
+# Add current directory and the benchmark stand-ins to path
+sys.path.append('.')
+sys.path.append('benchmarks')
+
+from fake_supabase import FakeSupabase, seed
+from supabase_config import ReactionBuffer, count_reactions
+
+def reactions_by_user(client, post_id):
+    rows = client.table("reactions").select("user_id,emoji").eq("post_id", post_id).execute().data
+    return {row["user_id"]: row["emoji"] for row in rows}
+
+def test_clicks_coalesce():
+    """Rapid clicks write only each user's last emoji per post, in one upsert"""
+    client = seed(FakeSupabase(), 2, reactions_per_post=0)
+    first, second = [row["id"] for row in client.table("posts").select("id").execute().data]
+    buffer = ReactionBuffer(client, delay=60)
+
+    buffer.add(first, "🔥", "user-a")
+    buffer.add(first, "😂", "user-a")
+    buffer.add(first, "❤️", "user-a")
+    buffer.add(first, "😢", "user-b")
+    buffer.add(second, "😂", "user-a")
+    assert reactions_by_user(client, first) == {}
+
+    client.round_trips = 0
+    buffer.flush()
+    assert client.round_trips == 1
+    # Nothing pending, nothing sent
+    buffer.flush()
+    assert client.round_trips == 1
+
+    assert reactions_by_user(client, first) == {"user-a": "❤️", "user-b": "😢"}
+    assert reactions_by_user(client, second) == {"user-a": "😂"}
+
+    # A later click replaces the stored reaction instead of adding one
+    buffer.add(first, "👍", "user-a")
+    buffer.flush()
+    assert sorted((row["emoji"], row["count"]) for row in count_reactions(client, first)) == [("👍", 1), ("😢", 1)]
+
+def test_flushes_after_quiet_period():
+    """The timer writes pending reactions once clicks stop for `delay` seconds"""
+    client = seed(FakeSupabase(), 1, reactions_per_post=0)
+    post_id = client.table("posts").select("id").execute().data[0]["id"]
+    buffer = ReactionBuffer(client, delay=0.2)
+
+    buffer.add(post_id, "🔥", "user-a")
+    time.sleep(0.1)
+    # Each click restarts the timer
+    buffer.add(post_id, "😂", "user-a")
+    time.sleep(0.15)
+    assert reactions_by_user(client, post_id) == {}
+    time.sleep(0.3)
+    assert reactions_by_user(client, post_id) == {"user-a": "😂"}
+
+def test_failed_flush_is_logged():
+    """Write errors don't escape the timer thread"""
+    class BrokenClient:
+        def table(self, name):
+            raise ConnectionError("database is down")
+
+    buffer = ReactionBuffer(BrokenClient(), delay=60)
+    buffer.add("post", "🔥", "user-a")
+    with patch("supabase_config.logger") as logger:
+        buffer.flush()
+    assert logger.exception.called
+
+if __name__ == "__main__":
+    test_clicks_coalesce()
+    test_flushes_after_quiet_period()
+    test_failed_flush_is_logged()
+    print("✅ Reaction buffer tests passed!")
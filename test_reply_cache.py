@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Test AI reply cache expiry and eviction (runs offline)
+"""
+
+import os
+import sys
+import time
+import tempfile
+from unittest.mock import patch
+
+# Add current directory to path
+sys.path.append('.')
+
+from reply_cache import ReplyCache
+
+def new_cache(**kwargs):
+    return ReplyCache(os.path.join(tempfile.mkdtemp(), "replies.sqlite3"), **kwargs)
+
+def test_hits_ignore_whitespace_and_case():
+    """The same text with different spacing or case is a hit; other modes and models are not"""
+    cache = new_cache()
+    cache.set("I eat cereal for dinner", "funny", "model", "Breakfast for rebels.")
+    assert cache.get("  i eat   CEREAL for dinner ", "funny", "model") == "Breakfast for rebels."
+    assert cache.get("I eat cereal for dinner", "wise", "model") is None
+    assert cache.get("I eat cereal for dinner", "funny", "other") is None
+    assert cache.stats() == {"hits": 1, "misses": 2, "hit_rate": 1 / 3, "size": 1}
+
+def test_expiry():
+    """Entries older than max_age are misses and get dropped"""
+    cache = new_cache(max_age=60)
+    with patch("reply_cache.time.time", return_value=1000):
+        cache.set("old confession", "funny", "model", "reply")
+    with patch("reply_cache.time.time", return_value=1059):
+        assert cache.get("old confession", "funny", "model") == "reply"
+    with patch("reply_cache.time.time", return_value=1061):
+        assert cache.get("old confession", "funny", "model") is None
+    assert cache.stats()["size"] == 0
+
+    # Expired entries are also swept on the next write
+    with patch("reply_cache.time.time", return_value=2000):
+        cache.set("first", "funny", "model", "reply")
+    with patch("reply_cache.time.time", return_value=2100):
+        cache.set("second", "funny", "model", "reply")
+    assert cache.stats()["size"] == 1
+
+def test_lru_eviction():
+    """Past max_entries the least recently used entry goes, not the oldest"""
+    cache = new_cache(max_entries=2)
+    now = time.time()
+    with patch("reply_cache.time.time", return_value=now):
+        cache.set("a", "funny", "model", "reply a")
+    with patch("reply_cache.time.time", return_value=now + 1):
+        cache.set("b", "funny", "model", "reply b")
+    with patch("reply_cache.time.time", return_value=now + 2):
+        assert cache.get("a", "funny", "model") == "reply a"
+    with patch("reply_cache.time.time", return_value=now + 3):
+        cache.set("c", "funny", "model", "reply c")
+
+    assert cache.get("a", "funny", "model") == "reply a"
+    assert cache.get("b", "funny", "model") is None
+    assert cache.get("c", "funny", "model") == "reply c"
+    assert cache.stats()["size"] == 2
+
+if __name__ == "__main__":
+    test_hits_ignore_whitespace_and_case()
+    test_expiry()
+    test_lru_eviction()
+    print("✅ Reply cache tests passed!")
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Test the SQLite storage backend and its PostgREST filter emulation (runs offline)
+"""
+
+import os
+import sys
+
+# Add current directory to path
+sys.path.append('.')
+
+# Keep test posts out of the near-duplicate index
+os.environ["DEDUP_ENABLED"] = "0"
+
+from storage import StorageBackend, SupabaseBackend, SQLiteBackend, SQLiteClient, _logic_to_sql
+from supabase_config import _fetch_stats
+
+def test_filter_parser():
+    """`or` strings translate nested and/or groups and in lists"""
+    assert _logic_to_sql("mood.eq.sad,mood.eq.meh") == ("(mood = ? OR mood = ?)", ["sad", "meh"])
+    assert _logic_to_sql('created_at.lt."2026-10-18T10:00:00+00:00",and(created_at.eq.2026,id.lt.7)') == (
+        "(created_at < ? OR (created_at = ? AND id < ?))", ["2026-10-18T10:00:00+00:00", 2026, 7]
+    )
+    assert _logic_to_sql('mood.in.(sad,"a,b"),or(id.gte.1,id.neq.x)') == (
+        "(mood IN (?,?) OR (id >= ? OR id != ?))", ["sad", "a,b", 1, "x"]
+    )
+    for bad in ("mood.like.sad", "mood.in.sad", "mood"):
+        try:
+            _logic_to_sql(bad)
+        except ValueError:
+            continue
+        raise AssertionError(f"accepted {bad}")
+
+def test_filter_rows():
+    """The translated filters select the same rows PostgREST would"""
+    client = SQLiteClient(":memory:")
+    backend = SQLiteBackend(client=client)
+    for i, mood in enumerate(["sad", "meh", "lol", "happy"]):
+        backend.create_post(f"confession {i}", mood)
+
+    def moods(filters):
+        rows = client.table("posts").select("mood").or_(filters).execute().data
+        return sorted(row["mood"] for row in rows)
+
+    assert moods("mood.eq.sad,mood.eq.lol") == ["lol", "sad"]
+    assert moods("mood.in.(meh,happy)") == ["happy", "meh"]
+    assert moods("and(mood.neq.sad,mood.neq.meh),content.eq.\"confession 0\"") == ["happy", "lol", "sad"]
+    assert moods("mood.in.()") == []
+
+def test_backend_is_abstract():
+    """A backend missing an operation can't be created"""
+    try:
+        StorageBackend()
+    except TypeError:
+        pass
+    else:
+        raise AssertionError("StorageBackend is instantiable")
+
+    class Partial(StorageBackend):
+        def create_post(self, content, mood, user_id=None):
+            return None
+    try:
+        Partial()
+    except TypeError:
+        pass
+    else:
+        raise AssertionError("partial backend is instantiable")
+
+def test_backend_parity():
+    """Both backends see the same data the same way"""
+    client = SQLiteClient(":memory:")
+    backends = [SupabaseBackend(client), SQLiteBackend(client=client)]
+    ids = []
+    for i, backend in enumerate(backends * 3):
+        post = backend.create_post(f"confession {i}", ["sad", "lol"][i % 2], f"user-{i}")
+        ids.append(post["id"])
+        backend.create_comment(post["id"], f"comment {i}", f"user-{i}")
+        backend.add_reaction(ids[0], ["🔥", "😂"][i % 2], f"user-{i}")
+    # Changing a reaction replaces it on both
+    backends[0].add_reaction(ids[0], "😂", "user-0")
+    backends[1].add_reaction(ids[0], "😂", "user-1")
+
+    def snapshot(backend):
+        _fetch_stats.clear()
+        return (
+            [post["id"] for post in backend.get_posts(limit=10)],
+            [post["id"] for post in backend.get_posts(limit=10, mood="sad")],
+            [comment["content"] for comment in backend.get_comments(ids[0])],
+            sorted((row["emoji"], row["count"]) for row in backend.count_reactions(ids[0])),
+            backend.get_user_stats(),
+        )
+
+    supabase, sqlite = (snapshot(backend) for backend in backends)
+    assert supabase == sqlite, (supabase, sqlite)
+    assert supabase[0] == ids[::-1]
+    assert supabase[3] == [("🔥", 2), ("😂", 4)]
+    assert supabase[4]["posts"] == 6 and supabase[4]["reactions"] == 6
+
+    page = backends[1].get_posts(limit=2)
+    rest = backends[1].get_posts(limit=10, before=(page[-1]["created_at"], page[-1]["id"]))
+    assert [post["id"] for post in page + rest] == ids[::-1]
+
+    assert backends[1].delete_all_data()[0]
+    assert backends[0].get_posts() == [] and backends[1].get_comments(ids[0]) == []
+
+if __name__ == "__main__":
+    test_filter_parser()
+    test_filter_rows()
+    test_backend_is_abstract()
+    test_backend_parity()
+    print("✅ Storage tests passed!")